@@ -25,6 +25,7 @@ TRAINING_TYPES = {
 # 训练状态
 TRAINING_STATES = {
     'pending': '待开始',
+    'queued': '排队中',
     'running': '训练中',
     'completed': '已完成',
     'failed': '失败',
@@ -52,6 +52,7 @@ class LabelingConfig:
     default_prompt: str = ""
     translation_prompt: str = ""
     model_type: str = "LM_STUDIO"
+    claude_model: str = "claude-3-5-sonnet-latest"
     delay_between_calls: float = 2.0
     
     def __post_init__(self):
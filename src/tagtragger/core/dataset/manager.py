@@ -20,6 +20,10 @@ from ...utils.exceptions import (
 from ...utils.validators import validate_dataset_name, validate_directory
 from ...config import get_config
 
+# 加载标签时识别的图片扩展名
+_IMAGE_EXTENSIONS = frozenset({'.jpg', '.jpeg', '.png', '.bmp', '.gif', '.tiff', '.webp'})
+
+
 class DatasetManager:
     """数据集管理器"""
     
@@ -52,16 +56,17 @@ class DatasetManager:
             if any(ds.name == name for ds in self.datasets.values()):
                 raise DatasetCreateError("数据集名称已存在")
 
-            dataset_id = str(uuid.uuid4())
+            dataset_id = uuid.uuid4().hex
             dataset = Dataset(
                 dataset_id=dataset_id,
                 name=name,
                 description=description,
-                dataset_type=dataset_type
+                dataset_type=dataset_type,
+                path=self.get_dataset_path(dataset_id)
             )
 
             # 创建目录结构
-            dataset_path = self.get_dataset_path(dataset_id)
+            dataset_path = dataset.path
             original_path = dataset_path / "original"
             cache_path = dataset_path / "cache"
             cache_path.mkdir(parents=True, exist_ok=True)
@@ -101,7 +106,7 @@ class DatasetManager:
                 config_file.unlink()
 
             # 删除数据目录
-            dataset_path = self.get_dataset_path(dataset_id)
+            dataset_path = dataset.path
             if dataset_path.exists():
                 shutil.rmtree(dataset_path)
 
@@ -181,7 +186,7 @@ class DatasetManager:
                 dataset_export_dir = export_path / f"{dataset.name}_{dataset.dataset_id[:8]}"
                 dataset_export_dir.mkdir(parents=True, exist_ok=True)
 
-                dataset_images_dir = self.get_dataset_path(dataset_id) / "original"
+                dataset_images_dir = dataset.path / "original"
 
                 for filename, label in dataset.images.items():
                     # 复制图片
@@ -281,6 +286,9 @@ class DatasetManager:
 
     def get_dataset_path(self, dataset_id: str) -> Path:
         """获取数据集目录路径"""
+        dataset = self.datasets.get(dataset_id)
+        if dataset is not None and dataset.path is not None:
+            return dataset.path
         return self.datasets_dir / dataset_id
 
     def get_dataset_image_path(self, dataset_id: str, filename: str, image_type: str = "original") -> Optional[str]:
@@ -339,6 +347,7 @@ class DatasetManager:
                         data = json.load(f)
                     
                     dataset = Dataset.from_dict(data)
+                    dataset.path = self.get_dataset_path(dataset.dataset_id)
                     self.datasets[dataset.dataset_id] = dataset
                     
                     # 加载对应的标签文件
@@ -360,7 +369,7 @@ class DatasetManager:
             validate_image_file(image_path)
 
             filename = os.path.basename(image_path)
-            original_dir = self.get_dataset_path(dataset.dataset_id) / "original"
+            original_dir = dataset.path / "original"
             
             # 复制到原图目录
             dest_path = original_dir / filename
@@ -384,20 +393,33 @@ class DatasetManager:
 
     def _load_label_files(self, dataset: Dataset):
         """加载数据集的所有标签文件"""
-        original_dir = self.get_dataset_path(dataset.dataset_id) / "original"
+        original_dir = dataset.path / "original"
         if not original_dir.exists():
             return
 
-        for image_file in original_dir.iterdir():
-            if image_file.suffix.lower() in {'.jpg', '.jpeg', '.png', '.bmp', '.gif', '.tiff', '.webp'}:
-                label_file = image_file.with_suffix('.txt')
-                if label_file.exists():
-                    try:
-                        with open(label_file, 'r', encoding='utf-8') as f:
-                            label = f.read().strip()
-                        dataset.images[image_file.name] = label
-                    except Exception as e:
-                        log_error(f"读取标签文件失败 {label_file}: {str(e)}")
+        # 一次目录遍历同时收集图片和标签文件，避免逐个图片stat标签文件
+        images: List[Tuple[str, str]] = []
+        label_files: Dict[str, str] = {}
+        with os.scandir(original_dir) as entries:
+            for entry in entries:
+                stem, ext = os.path.splitext(entry.name)
+                ext = ext.lower()
+                if ext in _IMAGE_EXTENSIONS:
+                    images.append((entry.name, stem))
+                elif ext == '.txt' and entry.is_file():
+                    label_files[stem] = entry.path
+
+        # 先收集全部标签，最后一次性合并到数据集
+        labels: Dict[str, str] = {}
+        for image_name, stem in images:
+            label_path = label_files.get(stem)
+            if label_path is not None:
+                try:
+                    with open(label_path, 'r', encoding='utf-8') as f:
+                        labels[image_name] = f.read().strip()
+                except Exception as e:
+                    log_error(f"读取标签文件失败 {label_path}: {str(e)}")
+        dataset.images.update(labels)
 
     def _load_label_from_txt(self, image_path: str) -> str:
         """从txt文件加载标签"""
@@ -424,14 +446,15 @@ class DatasetManager:
 
     def _get_or_create_preview(self, dataset_id: str, filename: str) -> Optional[Path]:
         """获取或创建预览图"""
-        preview_dir = self.get_dataset_path(dataset_id) / "cache" / "previews"
+        dataset_path = self.get_dataset_path(dataset_id)
+        preview_dir = dataset_path / "cache" / "previews"
         preview_path = preview_dir / filename
         
         if preview_path.exists():
             return preview_path
             
         # 生成预览图
-        original_path = self.get_dataset_path(dataset_id) / "original" / filename
+        original_path = dataset_path / "original" / filename
         if original_path.exists():
             if self.image_processor.create_preview(
                 str(original_path), 
@@ -444,7 +467,8 @@ class DatasetManager:
 
     def _get_or_create_training_image(self, dataset_id: str, filename: str, resolution: str = "1024,1024") -> Optional[Path]:
         """获取或创建训练分辨率图片"""
-        training_dir = self.get_dataset_path(dataset_id) / "cache" / "training" / resolution.replace(',', 'x')
+        dataset_path = self.get_dataset_path(dataset_id)
+        training_dir = dataset_path / "cache" / "training" / resolution.replace(',', 'x')
         training_dir.mkdir(parents=True, exist_ok=True)
         training_path = training_dir / filename
         
@@ -452,7 +476,7 @@ class DatasetManager:
             return training_path
             
         # 生成训练分辨率图片
-        original_path = self.get_dataset_path(dataset_id) / "original" / filename
+        original_path = dataset_path / "original" / filename
         if original_path.exists():
             width, height = map(int, resolution.split(','))
             if self.image_processor.create_training_image(
@@ -3,6 +3,7 @@ Dataset data models
 """
 
 from datetime import datetime
+from pathlib import Path
 from typing import Dict, List, Optional
 from dataclasses import dataclass, field
 from ...utils.logger import log_error
@@ -19,10 +20,12 @@ class Dataset:
     modified_time: Optional[str] = None
     images: Dict[str, str] = field(default_factory=dict)  # {filename: label}
     tags: List[str] = field(default_factory=list)
+    # 数据集目录，由DatasetManager绑定一次，不参与序列化
+    path: Optional[Path] = field(default=None, repr=False, compare=False)
     
     def __post_init__(self):
         if self.created_time is None:
-            self.created_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            self.created_time = datetime.now().isoformat(sep=' ', timespec='seconds')
         if self.modified_time is None:
             self.modified_time = self.created_time
 
@@ -116,7 +119,7 @@ class Dataset:
 
     def _update_modified_time(self):
         """更新修改时间"""
-        self.modified_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        self.modified_time = datetime.now().isoformat(sep=' ', timespec='seconds')
 
     def validate_type(self) -> bool:
         """验证数据集类型"""
@@ -2,16 +2,44 @@
 AI Client - AI服务调用客户端
 """
 
-import base64
+import asyncio
+import hashlib
 import json
+import os
+import threading
 import requests
-from typing import Optional, List, Dict, Any, Union
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional, List, Dict, Any, Union, Tuple
 from enum import Enum
 
+try:
+    # pybase64 在运行时选择 SIMD 编码实现，未安装时回退到标准库
+    import pybase64 as base64
+except ImportError:
+    import base64
+
 from ...utils.logger import log_error, log_info
 from ...utils.exceptions import AIServiceError
 from ...config import get_config
 
+# 图像分块读取大小，须为3的倍数，保证分块编码后中间不出现填充符
+_IMAGE_CHUNK_SIZE = 48 * 1024
+
+# 内存响应缓存最大条目数
+_MEM_CACHE_MAX_ENTRIES = 512
+
+# 已编码图像缓存的总大小上限（字节）
+_IMAGE_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+# 磁盘响应缓存最大文件数，超出后按修改时间删除最旧的条目
+_DISK_CACHE_MAX_FILES = 2048
+
+# 调用未指定temperature时各服务使用的默认值
+_DEFAULT_TEMPERATURE = 0.7
+
 class ModelType(Enum):
     """AI模型类型"""
     GPT = "GPT"
@@ -22,9 +50,30 @@ class ModelType(Enum):
 class AIClient:
     """AI服务客户端"""
     
+    # 常见写法到模型类型的映射，避免每次调用都做大小写和空格转换
+    _STR_TO_ENUM: Dict[str, ModelType] = {
+        **{m.name: m for m in ModelType},
+        **{m.name.lower(): m for m in ModelType},
+        **{m.value: m for m in ModelType},
+        "lm studio": ModelType.LM_STUDIO,
+        "LM Studio": ModelType.LM_STUDIO,
+    }
+    
     def __init__(self):
         self.config = get_config()
         self._setup_clients()
+        
+        # 响应缓存：内存LRU + 磁盘JSON
+        self._mem_cache: "OrderedDict[str, str]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._cache_dir = Path(self.config.storage.workspace_root) / "ai_cache"
+        # 磁盘缓存文件数，首次写入时统计
+        self._disk_cache_count: Optional[int] = None
+        # 图像内容哈希缓存 path -> (mtime_ns, size, digest)
+        self._image_digests: Dict[str, Tuple[int, int, str]] = {}
+        # 已编码图像缓存 (path, mtime_ns, size) -> data URI
+        self._img_cache: "OrderedDict[Tuple[str, int, int], str]" = OrderedDict()
+        self._img_cache_bytes = 0
     
     def _setup_clients(self):
         """设置各种AI客户端"""
@@ -34,6 +83,14 @@ class AIClient:
             'base_url': 'https://api.openai.com/v1',
             'model': 'gpt-4o'
         }
+        self._openai_client = None
+        
+        # Claude配置
+        self.claude_config = {
+            'api_key': os.environ.get('ANTHROPIC_API_KEY', ''),
+            'model': self.config.labeling.claude_model
+        }
+        self._claude_client = None
         
         # LM Studio配置
         self.lm_studio_config = {
@@ -41,6 +98,20 @@ class AIClient:
             'model': 'local-model'
         }
         
+        # 复用HTTP连接，避免每次调用重新建立连接
+        self._session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=16,
+            max_retries=Retry(total=2, backoff_factor=0.2)
+        )
+        self._session.mount('http://', adapter)
+        self._session.mount('https://', adapter)
+        
+        # 异步客户端在首次异步调用时按事件循环创建
+        self._async_client = None
+        self._async_loop = None
+        
         # 从配置文件加载API密钥
         self._load_api_keys()
     
@@ -55,6 +126,8 @@ class AIClient:
                         self.gpt_config['api_key'] = keys['OPENAI_API_KEY']
                     if 'AZURE_ENDPOINT' in keys:
                         self.gpt_config['base_url'] = keys['AZURE_ENDPOINT']
+                    if 'ANTHROPIC_API_KEY' in keys:
+                        self.claude_config['api_key'] = keys['ANTHROPIC_API_KEY']
             except FileNotFoundError:
                 log_info("未找到gpt_key.json，使用默认配置")
         except Exception as e:
@@ -65,33 +138,249 @@ class AIClient:
                 prompt: str,
                 content: Optional[str] = None,
                 image_path: Optional[str] = None,
+                cache: bool = False,
                 **kwargs) -> str:
-        """调用AI服务"""
+        """调用AI服务（cache=True 且 temperature 为0时才会缓存响应）"""
         try:
             # 转换模型类型
             if isinstance(model_type, str):
-                model_type = ModelType[model_type.upper().replace(' ', '_')]
+                model_type = self._to_model_type(model_type)
+            
+            # 命中缓存直接返回
+            cache_key = self._cache_key(model_type, prompt, content, image_path, kwargs) if cache else None
+            if cache_key:
+                cached = self._cache_get(cache_key)
+                if cached is not None:
+                    return cached
             
-            # 构建消息
+            # 构建消息；图像加载失败回退为纯文本时不缓存结果
             messages = self._build_messages(prompt, content, image_path)
+            if image_path and not self._has_image(messages):
+                cache_key = None
             
             # 调用相应的服务
             if model_type == ModelType.GPT:
-                return self._call_gpt(messages, **kwargs)
+                result = self._call_gpt(messages, **kwargs)
             elif model_type == ModelType.LM_STUDIO:
-                return self._call_lm_studio(messages, **kwargs)
+                result = self._call_lm_studio(messages, **kwargs)
             elif model_type == ModelType.CLAUDE:
-                return self._call_claude(messages, **kwargs)
+                result = self._call_claude(messages, **kwargs)
             elif model_type == ModelType.LOCAL:
-                return self._call_local(messages, **kwargs)
+                result = self._call_local(messages, **kwargs)
             else:
                 raise AIServiceError(str(model_type), "不支持的模型类型")
+            
+            if cache_key:
+                self._cache_put(cache_key, result)
+            return result
                 
         except Exception as e:
             error_msg = f"AI调用失败: {str(e)}"
             log_error(error_msg)
             raise AIServiceError(str(model_type), error_msg)
     
+    async def call_ai_async(self,
+                            model_type: Union[str, ModelType],
+                            prompt: str,
+                            content: Optional[str] = None,
+                            image_path: Optional[str] = None,
+                            cache: bool = False,
+                            **kwargs) -> str:
+        """异步调用AI服务（LM Studio走异步HTTP，其余服务在线程中执行）"""
+        try:
+            if isinstance(model_type, str):
+                model_type = self._to_model_type(model_type)
+            
+            if model_type != ModelType.LM_STUDIO:
+                return await asyncio.to_thread(
+                    self.call_ai, model_type, prompt, content, image_path, cache, **kwargs
+                )
+            
+            # 图像哈希和编码涉及磁盘读取，放到线程中避免阻塞事件循环
+            cache_key = None
+            if cache:
+                cache_key = await asyncio.to_thread(
+                    self._cache_key, model_type, prompt, content, image_path, kwargs
+                )
+                if cache_key:
+                    cached = self._cache_get(cache_key)
+                    if cached is not None:
+                        return cached
+            
+            messages = await asyncio.to_thread(self._build_messages, prompt, content, image_path)
+            if image_path and not self._has_image(messages):
+                cache_key = None
+            result = await self._call_lm_studio_async(messages, **kwargs)
+            
+            if cache_key:
+                self._cache_put(cache_key, result)
+            return result
+            
+        except AIServiceError:
+            raise
+        except Exception as e:
+            error_msg = f"AI调用失败: {str(e)}"
+            log_error(error_msg)
+            raise AIServiceError(str(model_type), error_msg)
+    
+    async def call_ai_batch(self,
+                            reqs: List[Dict[str, Any]],
+                            concurrency: int = 8) -> List[Union[str, Exception]]:
+        """
+        批量执行AI调用，最多同时发送concurrency个请求
+        
+        批内完全相同且结果确定（temperature为0）的请求合并为一次调用，结果分发给每一项。
+        
+        Args:
+            reqs: 调用参数列表，每项为call_ai的关键字参数
+            concurrency: 同时发送的最大请求数
+            
+        Returns:
+            List: 与reqs顺序一致的结果，失败项为对应的异常对象
+        """
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+        
+        async def run(req: Dict[str, Any]) -> str:
+            async with semaphore:
+                return await self.call_ai_async(**req)
+        
+        calls: List[asyncio.Future] = []
+        merged: Dict[str, asyncio.Future] = {}
+        for req in reqs:
+            key = self._coalesce_key(req)
+            if key is None:
+                calls.append(asyncio.ensure_future(run(req)))
+                continue
+            if key not in merged:
+                merged[key] = asyncio.ensure_future(run(req))
+            calls.append(merged[key])
+        return await asyncio.gather(*calls, return_exceptions=True)
+    
+    def _coalesce_key(self, req: Dict[str, Any]) -> Optional[str]:
+        """
+        批内合并请求的键，不可合并时返回None
+        
+        采样输出（temperature不为0）每次调用都应得到不同结果，不能合并；
+        聊天补全接口不支持一次请求多个不同的提示词，不同请求也无法合并。
+        """
+        if req.get('temperature', _DEFAULT_TEMPERATURE) != 0:
+            return None
+        params = dict(req)
+        params.pop('cache', None)
+        model_type = params.get('model_type')
+        if isinstance(model_type, str):
+            model_type = self._STR_TO_ENUM.get(model_type, model_type)
+        params['model_type'] = getattr(model_type, 'value', model_type)
+        return json.dumps(params, sort_keys=True, ensure_ascii=False, default=str)
+    
+    def _to_model_type(self, model_type: str) -> ModelType:
+        """将字符串转换为模型类型"""
+        return self._STR_TO_ENUM.get(model_type) or ModelType[model_type.upper().replace(' ', '_')]
+    
+    def _cache_key(self,
+                   model_type: ModelType,
+                   prompt: str,
+                   content: Optional[str],
+                   image_path: Optional[str],
+                   params: Dict[str, Any]) -> Optional[str]:
+        """
+        根据请求内容计算缓存键，不可缓存时返回None
+        
+        只缓存确定性的调用（temperature为0），采样输出每次都应重新生成；
+        图像无法读取时不缓存，避免不同的缺失图像共用同一个键。
+        """
+        if params.get('temperature', _DEFAULT_TEMPERATURE) != 0:
+            return None
+        image_digest = ""
+        if image_path:
+            image_digest = self._image_digest(image_path)
+            if not image_digest:
+                return None
+        params_text = json.dumps(params, sort_keys=True, ensure_ascii=False, default=str)
+        raw = f"{model_type.value}|{prompt}|{content or ''}|{image_digest}|{params_text}"
+        return hashlib.blake2b(raw.encode('utf-8')).hexdigest()[:32]
+    
+    def _image_digest(self, image_path: str) -> str:
+        """获取图像内容哈希，按路径+修改时间+大小缓存；无法读取时返回空字符串"""
+        try:
+            st = os.stat(image_path)
+        except OSError:
+            return ""
+        
+        memo = self._image_digests.get(image_path)
+        if memo and memo[0] == st.st_mtime_ns and memo[1] == st.st_size:
+            return memo[2]
+        
+        # 哈希在编码图像时顺带计算，随后构建消息时可直接复用已编码结果
+        try:
+            self._get_image_uri(image_path)
+        except Exception:
+            return ""
+        memo = self._image_digests.get(image_path)
+        return memo[2] if memo else ""
+    
+    def _cache_get(self, key: str) -> Optional[str]:
+        """按内存 -> 磁盘的顺序查找缓存"""
+        with self._cache_lock:
+            if key in self._mem_cache:
+                self._mem_cache.move_to_end(key)
+                return self._mem_cache[key]
+        
+        cache_file = self._cache_dir / f"{key}.json"
+        try:
+            with open(cache_file, 'r', encoding='utf-8') as f:
+                result = json.load(f)['result']
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            log_error(f"读取AI响应缓存失败 {cache_file}: {str(e)}")
+            return None
+        
+        self._remember(key, result)
+        return result
+    
+    def _cache_put(self, key: str, result: str) -> None:
+        """写入内存和磁盘缓存"""
+        self._remember(key, result)
+        try:
+            self._cache_dir.mkdir(parents=True, exist_ok=True)
+            cache_file = self._cache_dir / f"{key}.json"
+            is_new = not cache_file.exists()
+            with open(cache_file, 'w', encoding='utf-8') as f:
+                json.dump({'result': result}, f, ensure_ascii=False)
+            if is_new:
+                self._count_disk_entry()
+        except Exception as e:
+            log_error(f"写入AI响应缓存失败: {str(e)}")
+    
+    def _count_disk_entry(self) -> None:
+        """记录新增的磁盘缓存文件，超出上限时删除最旧的文件"""
+        with self._cache_lock:
+            if self._disk_cache_count is None:
+                self._disk_cache_count = sum(1 for _ in os.scandir(self._cache_dir))
+            else:
+                self._disk_cache_count += 1
+            if self._disk_cache_count <= _DISK_CACHE_MAX_FILES:
+                return
+            
+            # 一次删到上限的90%，避免每次写入都扫描目录
+            entries = sorted(os.scandir(self._cache_dir), key=lambda e: e.stat().st_mtime_ns)
+            excess = len(entries) - _DISK_CACHE_MAX_FILES * 9 // 10
+            for entry in entries[:max(0, excess)]:
+                try:
+                    os.unlink(entry.path)
+                except OSError:
+                    pass
+            self._disk_cache_count = sum(1 for _ in os.scandir(self._cache_dir))
+    
+    def _remember(self, key: str, result: str) -> None:
+        """写入内存LRU缓存"""
+        with self._cache_lock:
+            self._mem_cache[key] = result
+            self._mem_cache.move_to_end(key)
+            while len(self._mem_cache) > _MEM_CACHE_MAX_ENTRIES:
+                self._mem_cache.popitem(last=False)
+    
     def _build_messages(self, 
                        prompt: str, 
                        content: Optional[str] = None, 
@@ -100,12 +389,12 @@ class AIClient:
         if image_path:
             # 多模态消息（文本+图像）
             try:
-                base64_image = self._image_to_base64(image_path)
+                image_uri = self._get_image_uri(image_path)
                 return [{
                     "role": "user",
                     "content": [
                         {"type": "text", "text": prompt},
-                        {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{base64_image}"}},
+                        {"type": "image_url", "image_url": {"url": image_uri}},
                     ],
                 }]
             except Exception as e:
@@ -120,29 +409,60 @@ class AIClient:
         
         return messages
     
-    def _image_to_base64(self, file_path: str) -> str:
-        """将图像转换为base64编码"""
+    @staticmethod
+    def _has_image(messages: List[Dict[str, Any]]) -> bool:
+        """消息中是否包含图像（图像加载失败时会回退为纯文本）"""
+        return isinstance(messages[0]['content'], list)
+    
+    def _get_image_uri(self, image_path: str) -> str:
+        """获取图像data URI，文件未变化时复用已编码结果"""
+        st = os.stat(image_path)
+        key = (image_path, st.st_mtime_ns, st.st_size)
+        
+        with self._cache_lock:
+            uri = self._img_cache.get(key)
+            if uri is not None:
+                self._img_cache.move_to_end(key)
+                return uri
+        
+        uri, digest = self._image_to_data_uri(image_path)
+        self._image_digests[image_path] = (st.st_mtime_ns, st.st_size, digest)
+        if len(uri) > _IMAGE_CACHE_MAX_BYTES:
+            return uri
+        
+        with self._cache_lock:
+            if key not in self._img_cache:
+                self._img_cache[key] = uri
+                self._img_cache_bytes += len(uri)
+                while self._img_cache_bytes > _IMAGE_CACHE_MAX_BYTES:
+                    _, evicted = self._img_cache.popitem(last=False)
+                    self._img_cache_bytes -= len(evicted)
+        return uri
+    
+    def _image_to_data_uri(self, file_path: str) -> Tuple[str, str]:
+        """将图像分块编码为base64 data URI，避免整文件读入内存；同时返回内容哈希"""
         try:
+            buf = bytearray(b"data:image/jpeg;base64,")
+            hasher = hashlib.blake2b()
             with open(file_path, "rb") as image_file:
-                encoded_string = base64.b64encode(image_file.read())
-                return encoded_string.decode("utf-8")
+                while True:
+                    chunk = image_file.read(_IMAGE_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    hasher.update(chunk)
+                    buf += base64.b64encode(chunk)
+            return buf.decode("ascii"), hasher.hexdigest()
         except Exception as e:
             raise Exception(f"图像编码失败: {str(e)}")
     
     def _call_gpt(self, messages: List[Dict[str, Any]], **kwargs) -> str:
         """调用GPT服务"""
         try:
-            import openai
-            
-            # 设置API配置
-            openai.api_key = self.gpt_config['api_key']
-            openai.base_url = self.gpt_config['base_url']
-            
-            response = openai.chat.completions.create(
+            response = self._get_openai_client().chat.completions.create(
                 model=kwargs.get('model', self.gpt_config['model']),
                 messages=messages,
                 max_tokens=kwargs.get('max_tokens', 2000),
-                temperature=kwargs.get('temperature', 0.7)
+                temperature=kwargs.get('temperature', _DEFAULT_TEMPERATURE)
             )
             
             return response.choices[0].message.content.strip()
@@ -150,20 +470,29 @@ class AIClient:
         except Exception as e:
             raise AIServiceError("GPT", f"GPT调用失败: {str(e)}")
     
+    def _get_openai_client(self):
+        """获取复用连接池的OpenAI客户端（首次调用时创建）"""
+        if self._openai_client is None:
+            import httpx
+            import openai
+            
+            self._openai_client = openai.OpenAI(
+                api_key=self.gpt_config['api_key'],
+                base_url=self.gpt_config['base_url'],
+                http_client=httpx.Client(
+                    limits=httpx.Limits(max_keepalive_connections=8),
+                    timeout=60
+                )
+            )
+        return self._openai_client
+    
     def _call_lm_studio(self, messages: List[Dict[str, Any]], **kwargs) -> str:
         """调用LM Studio本地服务"""
         try:
             url = f"{self.lm_studio_config['base_url']}/chat/completions"
+            payload = self._build_lm_studio_payload(messages, **kwargs)
             
-            payload = {
-                "model": kwargs.get('model', self.lm_studio_config['model']),
-                "messages": messages,
-                "max_tokens": kwargs.get('max_tokens', 2000),
-                "temperature": kwargs.get('temperature', 0.7),
-                "stream": False
-            }
-            
-            response = requests.post(url, json=payload, timeout=60)
+            response = self._session.post(url, json=payload, timeout=60)
             response.raise_for_status()
             
             result = response.json()
@@ -174,10 +503,134 @@ class AIClient:
         except Exception as e:
             raise AIServiceError("LM_Studio", f"LM Studio调用失败: {str(e)}")
     
+    async def _call_lm_studio_async(self, messages: List[Dict[str, Any]], **kwargs) -> str:
+        """异步调用LM Studio本地服务"""
+        import httpx
+        
+        try:
+            url = f"{self.lm_studio_config['base_url']}/chat/completions"
+            payload = self._build_lm_studio_payload(messages, **kwargs)
+            
+            client = await self._get_async_client()
+            response = await client.post(url, json=payload)
+            response.raise_for_status()
+            
+            result = response.json()
+            return result['choices'][0]['message']['content'].strip()
+            
+        except httpx.HTTPError as e:
+            raise AIServiceError("LM_Studio", f"LM Studio连接失败: {str(e)}")
+        except Exception as e:
+            raise AIServiceError("LM_Studio", f"LM Studio调用失败: {str(e)}")
+    
+    def _build_lm_studio_payload(self, messages: List[Dict[str, Any]], **kwargs) -> Dict[str, Any]:
+        """构建LM Studio请求体"""
+        return {
+            "model": kwargs.get('model', self.lm_studio_config['model']),
+            "messages": messages,
+            "max_tokens": kwargs.get('max_tokens', 2000),
+            "temperature": kwargs.get('temperature', _DEFAULT_TEMPERATURE),
+            "stream": False
+        }
+    
+    async def _get_async_client(self):
+        """获取当前事件循环共享的httpx异步客户端"""
+        import httpx
+        
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_loop is not loop:
+            # 连接池绑定在事件循环上，循环变化时需要重建并关闭旧客户端
+            old_client, old_loop = self._async_client, self._async_loop
+            self._async_client = httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=16, max_keepalive_connections=16),
+                timeout=60
+            )
+            self._async_loop = loop
+            if old_client is not None:
+                await self._close_async_client(old_client, old_loop)
+        return self._async_client
+    
+    @staticmethod
+    async def _close_async_client(client, client_loop) -> None:
+        """关闭旧的异步客户端，旧循环仍在运行时交给它自己关闭"""
+        try:
+            if client_loop is not None and client_loop.is_running():
+                asyncio.run_coroutine_threadsafe(client.aclose(), client_loop)
+            else:
+                await client.aclose()
+        except Exception as e:
+            log_error(f"关闭旧的异步HTTP客户端失败: {str(e)}")
+    
+    async def aclose(self) -> None:
+        """关闭异步HTTP客户端"""
+        if self._async_client is not None:
+            client, self._async_client, self._async_loop = self._async_client, None, None
+            await client.aclose()
+    
     def _call_claude(self, messages: List[Dict[str, Any]], **kwargs) -> str:
-        """调用Claude服务"""
-        # TODO: 实现Claude API调用
-        raise AIServiceError("Claude", "Claude服务暂未实现")
+        """调用Claude服务（提示词作为可缓存的system前缀）"""
+        try:
+            client = self._get_claude_client()
+            system, claude_messages = self._to_claude_messages(messages)
+            request = {
+                'model': kwargs.get('model', self.claude_config['model']),
+                'max_tokens': kwargs.get('max_tokens', 2000),
+                'temperature': kwargs.get('temperature', _DEFAULT_TEMPERATURE),
+                'messages': claude_messages,
+            }
+            if system:
+                request['system'] = system
+            
+            response = client.messages.create(**request)
+            return ''.join(
+                block.text for block in response.content if block.type == 'text'
+            ).strip()
+            
+        except Exception as e:
+            raise AIServiceError("Claude", f"Claude调用失败: {str(e)}")
+    
+    def _get_claude_client(self):
+        """获取Claude客户端（首次调用时创建）；anthropic为可选依赖，未安装时报错提示"""
+        if self._claude_client is None:
+            try:
+                import anthropic
+            except ImportError:
+                raise AIServiceError("Claude", "未安装anthropic，请安装可选依赖: pip install tagtragger[claude]")
+            self._claude_client = anthropic.Anthropic(api_key=self.claude_config['api_key'])
+        return self._claude_client
+    
+    def _to_claude_messages(self, messages: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        将OpenAI格式消息转换为Claude格式
+        
+        批量打标时提示词在每次调用中保持不变，将其放入带cache_control的
+        system块，后续调用即可命中Claude的提示词缓存；图像或待翻译文本作为用户消息。
+        """
+        first = messages[0]['content']
+        
+        if isinstance(first, list):
+            # 多模态消息：文本部分为提示词，图像部分为每次变化的内容
+            prefix = ''
+            tail: List[Dict[str, Any]] = []
+            for part in first:
+                if part['type'] == 'text':
+                    prefix = part['text']
+                elif part['type'] == 'image_url':
+                    header, _, data = part['image_url']['url'].partition(',')
+                    media_type = header[len('data:'):].split(';')[0] or 'image/jpeg'
+                    tail.append({
+                        'type': 'image',
+                        'source': {'type': 'base64', 'media_type': media_type, 'data': data}
+                    })
+        elif len(messages) > 1:
+            # 纯文本：第一条为提示词，其余为待处理内容
+            prefix = first
+            tail = [{'type': 'text', 'text': m['content']} for m in messages[1:]]
+        else:
+            return [], [{'role': 'user', 'content': first}]
+        
+        system = [{'type': 'text', 'text': prefix, 'cache_control': {'type': 'ephemeral'}}]
+        return system, [{'role': 'user', 'content': tail}]
     
     def _call_local(self, messages: List[Dict[str, Any]], **kwargs) -> str:
         """调用本地模型服务"""
@@ -188,7 +641,7 @@ class AIClient:
         """测试AI服务连接"""
         try:
             if isinstance(model_type, str):
-                model_type = ModelType[model_type.upper().replace(' ', '_')]
+                model_type = self._to_model_type(model_type)
             
             test_messages = [{"role": "user", "content": "Hello"}]
             
@@ -196,6 +649,8 @@ class AIClient:
                 self._call_gpt(test_messages, max_tokens=10)
             elif model_type == ModelType.LM_STUDIO:
                 self._call_lm_studio(test_messages, max_tokens=10)
+            elif model_type == ModelType.CLAUDE:
+                self._call_claude(test_messages, max_tokens=10)
             
             return True
         except Exception as e:
@@ -2,22 +2,91 @@
 Training Manager - 训练任务管理器
 """
 
+import hashlib
 import uuid
 import json
+import sqlite3
 import threading
-import math
 import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Optional, Callable, Any, Tuple
+from queue import Queue, Empty
+from typing import Dict, List, Optional, Callable, Any, Tuple, TextIO, Deque
 from datetime import datetime
 
+try:
+    # orjson 为可选依赖，未安装时回退到标准库json
+    import orjson
+except ImportError:
+    orjson = None
+
 from .models import TrainingConfig, TrainingTask, TrainingState, TrainingType
 from ..common.events import EventBus, JobQueue, Job
 from ...utils.logger import log_info, log_error, log_success
 from ...utils.exceptions import TrainingError, TrainingNotFoundError
 from ...config import get_config
-from .trainers.musubi_trainer import MusubiTrainer
 
+# 迁移旧版任务JSON文件时并行读取的最大线程数
+_LOAD_WORKERS = 8
+
+# 后台线程保存有新日志的任务快照的时间间隔（秒）
+_SNAPSHOT_INTERVAL = 5.0
+
+# 进度变化小于该值、状态不变且距上次写入不足指定秒数时，跳过进度持久化
+_PERSIST_PROGRESS_EPSILON = 0.005
+_PERSIST_MAX_INTERVAL = 5.0
+
+# 连续重复的日志行被折叠时，至少每隔该秒数输出一次重复计数
+_LOG_REPEAT_FLUSH_INTERVAL = 2.0
+
+# 可合并的事件：分发前再次发送时只保留每个任务最新的一条
+_COALESCED_EVENTS = frozenset(('task_progress',))
+
+# 进度事件的最短发送间隔（秒），步数变化足够大时不受此限制
+_PROGRESS_EMIT_INTERVAL = 0.5
+
+# 批量日志事件的发送间隔（秒）和单批最大行数
+_LOG_BATCH_INTERVAL = 0.1
+_LOG_BATCH_LINES = 64
+
+# 分发队列中的内部标记：日志缓冲攒满时通知分发线程立即发送批量日志
+_LOG_FLUSH_EVENT = '_log_flush'
+
+# 估算速度/ETA的采样窗口大小和EWMA平滑系数
+_SPEED_WINDOW_SIZE = 32
+_SPEED_EWMA_ALPHA = 0.2
+
+# 进度回调字段 -> 任务属性
+_PROGRESS_FIELDS = (
+    ('progress', 'progress'),
+    ('step', 'current_step'),
+    ('total_steps', 'total_steps'),
+    ('epoch', 'current_epoch'),
+    ('loss', 'loss'),
+    ('lr', 'learning_rate'),
+    ('speed', 'speed'),
+    ('eta_seconds', 'eta_seconds'),
+)
+_MISSING = object()
+
+# 随任务快照保存的进度字段
+_PERSISTED_PROGRESS_FIELDS = (
+    'progress', 'current_step', 'total_steps', 'current_epoch',
+    'loss', 'learning_rate', 'speed', 'eta_seconds'
+)
+
+
+def _dump_json_bytes(data: Dict[str, Any]) -> bytes:
+    """序列化为紧凑的UTF-8 JSON字节，优先使用orjson"""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def _load_json_bytes(raw: bytes) -> Any:
+    """解析UTF-8 JSON字节，优先使用orjson"""
+    return orjson.loads(raw) if orjson is not None else json.loads(raw)
 
 class TrainingManager:
     """训练任务管理器"""
@@ -25,36 +94,97 @@ class TrainingManager:
     def __init__(self, bus: Optional[EventBus] = None, queue: Optional[JobQueue] = None):
         self.config = get_config()
         self.tasks: Dict[str, TrainingTask] = {}
+        # 保护self.tasks，训练线程和UI线程都会访问
+        self._tasks_lock = threading.RLock()
 
         # 事件总线和任务队列（来自旧版training_manager.py）
         self.bus = bus
         self.queue = queue
 
-        # 初始化统一的训练器
-        try:
-            self.musubi_trainer = MusubiTrainer(self.bus)
-            log_info("Musubi 训练器初始化成功")
-        except Exception as e:
-            log_error(f"Musubi 训练器初始化失败: {e}")
-            self.musubi_trainer = None
+        # 统一的训练器在首次使用时再导入和创建
+        self._musubi_trainer = None
+        self._trainer_lock = threading.Lock()
+
+        # 训练任务队列，由一个常驻线程依次执行（首次启动任务时创建）
+        self._train_queue: Queue = Queue()
+        self._queued_trainings: Dict[str, Callable[[], None]] = {}
+        self._train_lock = threading.Lock()
+        self._train_thread: Optional[threading.Thread] = None
+
+        # task_id -> 最近的 (时间, 步数) 采样窗口，以及平滑后的速度(步/秒)
+        self._speed_window: Dict[str, Deque[Tuple[float, int]]] = {}
+        self._speed_ewma: Dict[str, float] = {}
 
-        # task_id -> (last_ts, last_step)
-        self._speed_cache: Dict[str, Tuple[float, int]] = {}
+        # task_id -> (上次发送进度事件的步数, 时间)
+        self._last_emit: Dict[str, Tuple[int, float]] = {}
 
         # 任务持久化目录
         self.tasks_dir = Path(self.config.storage.workspace_root) / "tasks"
         self.tasks_dir.mkdir(parents=True, exist_ok=True)
 
-        # 事件回调
-        self.callbacks: Dict[str, List[Callable]] = {
-            'task_state': [],
-            'task_progress': [],
-            'task_log': []
+        # 任务快照保存在 tasks/tasks.db（SQLite WAL模式），写入时持有_db_lock
+        self._db = self._open_task_db()
+
+        # 事件回调（不可变元组，增删时整体替换，分发时无需复制）
+        self.callbacks: Dict[str, Tuple[Callable, ...]] = {
+            'task_state': (),
+            'task_progress': (),
+            'task_log': (),
+            'task_log_batch': ()
         }
+        # 只在增删回调时加锁，分发时直接读取元组引用
+        self._cb_lock = threading.Lock()
+
+        # 进度按节流直接写入数据库；新日志由后台线程定期随快照保存
+        self._db_lock = threading.RLock()
+        self._logs_dirty: set = set()
+        # task_id -> (上次持久化的进度, 状态, 时间)
+        self._last_persisted: Dict[str, Tuple[float, TrainingState, float]] = {}
+
+        # task_id -> 上次写入的任务快照内容摘要
+        self._last_written: Dict[str, bytes] = {}
+
+        # task_id -> (配置对象, 序列化后的配置字典)
+        self._config_dicts: Dict[str, Tuple[TrainingConfig, Dict[str, Any]]] = {}
+
+        # task_id -> (上一行日志的哈希, 内容, 被折叠的重复次数, 上次输出时间)
+        self._log_repeat: Dict[str, Tuple[int, str, int, float]] = {}
+
+        # task_id -> 实时日志文件句柄（行缓冲，任务结束时关闭）
+        self._log_handles: Dict[str, TextIO] = {}
 
         # 加载现有任务
         self.load_tasks()
 
+        self._snapshot_thread = threading.Thread(target=self._snapshot_loop, daemon=True)
+        self._snapshot_thread.start()
+
+        # 事件由独立线程分发，避免较慢的订阅者阻塞训练输出的读取；
+        # 队列不设上限，写入永不阻塞（分发线程内的回调再次发送事件时也不会死锁）
+        self._event_queue: Queue = Queue()
+        # (事件, task_id) -> 尚未分发的最新事件数据，用于合并进度事件
+        self._pending_events: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._pending_lock = threading.Lock()
+        # task_id -> 待批量发送的日志行
+        self._log_buffer: Dict[str, List[str]] = {}
+        self._log_lock = threading.Lock()
+        self._event_thread = threading.Thread(target=self._event_pump, daemon=True)
+        self._event_thread.start()
+
+    @property
+    def musubi_trainer(self):
+        """Musubi训练器（延迟初始化，失败时返回None）"""
+        if self._musubi_trainer is None:
+            with self._trainer_lock:
+                if self._musubi_trainer is None:
+                    try:
+                        from .trainers.musubi_trainer import MusubiTrainer
+                        self._musubi_trainer = MusubiTrainer(self.bus)
+                        log_info("Musubi 训练器初始化成功")
+                    except Exception as e:
+                        log_error(f"Musubi 训练器初始化失败: {e}")
+        return self._musubi_trainer
+
     def create_task(self, config: TrainingConfig) -> str:
         """创建训练任务"""
         try:
@@ -72,7 +202,8 @@ class TrainingManager:
             )
 
             # 保存任务
-            self.tasks[task_id] = task
+            with self._tasks_lock:
+                self.tasks[task_id] = task
             self.save_task(task)
 
             log_info(f"创建训练任务: {config.name} (ID: {task_id})")
@@ -93,9 +224,8 @@ class TrainingManager:
                 log_error(f"任务状态不允许启动: {task.state}")
                 return False
 
-            # 更新任务状态
-            task.state = TrainingState.RUNNING
-            task.started_at = datetime.now()
+            # 排队等待训练线程执行，开始时间由训练线程实际开始时设置
+            task.state = TrainingState.QUEUED
             self.save_task(task)
 
             # 检查训练器可用性
@@ -105,6 +235,8 @@ class TrainingManager:
             # 直接启动训练（简化逻辑）
             def run_training():
                 try:
+                    task.started_at = datetime.now()
+                    self.save_task(task)
                     success = self.musubi_trainer.run_training(
                         task,
                         progress_callback=lambda data: self._on_progress(task_id, data),
@@ -115,7 +247,7 @@ class TrainingManager:
                         task.state = TrainingState.COMPLETED
                         task.progress = 1.0
                         log_success(f"训练任务完成: {task.config.name}")
-                    else:
+                    elif task.state != TrainingState.CANCELLED:
                         task.state = TrainingState.FAILED
                         log_error(f"训练任务失败: {task.config.name}")
                         
@@ -125,13 +257,22 @@ class TrainingManager:
                     log_error(f"训练任务异常: {e}")
                 finally:
                     task.completed_at = datetime.now()
+                    self._flush_log_repeat(task_id)
                     self.save_task(task)
+                    self._close_log(task_id)
+                    self._drop_speed_window(task_id)
                     self._emit_event('task_state', {'task_id': task_id, 'state': task.state})
 
-            training_thread = threading.Thread(target=run_training, daemon=True)
-            training_thread.start()
+            # 交给常驻的训练线程依次执行，训练器同一时间只能运行一个进程
+            with self._train_lock:
+                self._queued_trainings[task_id] = run_training
+                if self._train_thread is None:
+                    self._train_thread = threading.Thread(target=self._training_worker, daemon=True)
+                    self._train_thread.start()
+            self._train_queue.put(task_id)
 
-            log_info(f"开始训练任务: {task.name}")
+            log_info(f"训练任务已加入队列: {task.name}")
+            self._emit_event('task_state', {'task_id': task_id, 'state': task.state})
             return True
 
         except Exception as e:
@@ -139,6 +280,16 @@ class TrainingManager:
             return False
 
 
+    def _training_worker(self) -> None:
+        """后台线程：按提交顺序依次执行训练任务"""
+        while True:
+            task_id = self._train_queue.get()
+            with self._train_lock:
+                run_training = self._queued_trainings.pop(task_id, None)
+            # 已取消的任务会被移出，直接跳过
+            if run_training is not None:
+                run_training()
+
     def cancel_task(self, task_id: str) -> bool:
         """取消训练任务"""
         try:
@@ -146,16 +297,24 @@ class TrainingManager:
             if not task:
                 return False
 
-            if task.state != TrainingState.RUNNING:
+            if task.state not in (TrainingState.QUEUED, TrainingState.RUNNING):
                 return False
 
+            # 尚在排队的任务直接移出队列，不能终止正在运行的其他任务
+            with self._train_lock:
+                queued = self._queued_trainings.pop(task_id, None) is not None
+
             # 取消训练
-            if self.musubi_trainer:
-                self.musubi_trainer.cancel_training()
+            # 训练器尚未创建时不可能有正在运行的训练进程
+            if not queued and self._musubi_trainer:
+                self._musubi_trainer.cancel_training()
                 
             task.state = TrainingState.CANCELLED
             task.completed_at = datetime.now()
+            self._flush_log_repeat(task_id)
             self.save_task(task)
+            self._close_log(task_id)
+            self._drop_speed_window(task_id)
 
             log_info(f"取消训练任务: {task.name}")
             self._emit_event('task_state', {'task_id': task_id, 'state': task.state})
@@ -172,18 +331,28 @@ class TrainingManager:
             if not task:
                 return False
 
-            # 不能删除正在运行的任务
-            if task.state == TrainingState.RUNNING:
+            # 不能删除正在运行的任务；排队中的任务先移出队列，已被训练线程取出的视为正在运行
+            with self._train_lock:
+                if task.state == TrainingState.QUEUED:
+                    running = self._queued_trainings.pop(task_id, None) is None
+                else:
+                    running = task.state in (TrainingState.PREPARING, TrainingState.RUNNING)
+            if running:
                 log_error("不能删除正在运行的任务")
                 return False
 
-            # 删除任务文件
-            task_file = self.tasks_dir / f"{task_id}.json"
-            if task_file.exists():
-                task_file.unlink()
+            # 删除任务快照
+            self._close_log(task_id)
+            self._drop_speed_window(task_id)
+            self._config_dicts.pop(task_id, None)
+            self._last_written.pop(task_id, None)
+            with self._db_lock:
+                self._db.execute('DELETE FROM tasks WHERE id = ?', (task_id,))
+                self._db.commit()
 
             # 从内存中删除
-            del self.tasks[task_id]
+            with self._tasks_lock:
+                self.tasks.pop(task_id, None)
 
             log_info(f"删除训练任务: {task.name}")
             return True
@@ -194,191 +363,412 @@ class TrainingManager:
 
     def get_task(self, task_id: str) -> Optional[TrainingTask]:
         """获取训练任务"""
-        return self.tasks.get(task_id)
+        with self._tasks_lock:
+            return self.tasks.get(task_id)
 
     def list_tasks(self) -> List[TrainingTask]:
         """列出所有训练任务"""
-        return list(self.tasks.values())
+        with self._tasks_lock:
+            return list(self.tasks.values())
 
     def save_task(self, task: TrainingTask) -> None:
-        """保存训练任务到文件"""
+        """保存训练任务快照到数据库"""
         try:
-            task_file = self.tasks_dir / f"{task.id}.json"
             task_data = {
                 'id': task.id,
                 'name': task.name,
-                'config': {
-                    'name': task.config.name,
-                    'training_type': task.config.training_type.value,
-                    'dataset_id': task.config.dataset_id,
-                    'task_id': task.config.task_id,
-                    'epochs': task.config.epochs,
-                    'batch_size': task.config.batch_size,
-                    'learning_rate': task.config.learning_rate,
-                    'resolution': task.config.resolution,
-                    'network_dim': task.config.network_dim,
-                    'network_alpha': task.config.network_alpha,
-                    'repeats': task.config.repeats,
-                    'dataset_size': task.config.dataset_size,
-                    'enable_bucket': task.config.enable_bucket,
-                    'optimizer': task.config.optimizer,
-                    'scheduler': task.config.scheduler,
-                    'sample_prompt': task.config.sample_prompt,
-                    'sample_every_n_steps': task.config.sample_every_n_steps,
-                    'save_every_n_epochs': task.config.save_every_n_epochs,
-                    'gpu_ids': task.config.gpu_ids,
-                    'max_data_loader_n_workers': task.config.max_data_loader_n_workers,
-                    'persistent_data_loader_workers': task.config.persistent_data_loader_workers,
-                    'seed': task.config.seed,
-                },
+                'config': self._get_config_dict(task),
                 'state': task.state.value,
-                'progress': task.progress,
                 'created_at': task.created_at.isoformat(),
                 'started_at': task.started_at.isoformat() if task.started_at else None,
                 'completed_at': task.completed_at.isoformat() if task.completed_at else None,
+                'error_message': task.error_message,
                 'logs': task.logs[-100:]  # 只保存最近100条日志
             }
-
-            with open(task_file, 'w', encoding='utf-8') as f:
-                json.dump(task_data, f, indent=2, ensure_ascii=False)
+            for field in _PERSISTED_PROGRESS_FIELDS:
+                task_data[field] = getattr(task, field)
+
+            payload = _dump_json_bytes(task_data)
+            digest = hashlib.blake2b(payload, digest_size=16).digest()
+
+            with self._db_lock:
+                # 内容与上次写入相同时跳过写入
+                if self._last_written.get(task.id) != digest:
+                    self._db.execute(
+                        'INSERT OR REPLACE INTO tasks (id, data, updated) VALUES (?, ?, ?)',
+                        (task.id, payload, time.time())
+                    )
+                    self._db.commit()
+                    self._last_written[task.id] = digest
+                self._logs_dirty.discard(task.id)
 
         except Exception as e:
             log_error(f"保存训练任务失败: {e}")
 
-    def load_tasks(self) -> None:
-        """从文件加载训练任务"""
+    def _get_config_dict(self, task: TrainingTask) -> Dict[str, Any]:
+        """获取任务配置的可序列化字典，配置创建后不再变化，只构建一次"""
+        cached = self._config_dicts.get(task.id)
+        if cached is not None and cached[0] is task.config:
+            return cached[1]
+        config = task.config
+        config_data = {
+            'name': config.name,
+            'training_type': config.training_type.value,
+            'dataset_id': config.dataset_id,
+            'task_id': config.task_id,
+            'epochs': config.epochs,
+            'batch_size': config.batch_size,
+            'learning_rate': config.learning_rate,
+            'resolution': config.resolution,
+            'network_dim': config.network_dim,
+            'network_alpha': config.network_alpha,
+            'repeats': config.repeats,
+            'dataset_size': config.dataset_size,
+            'enable_bucket': config.enable_bucket,
+            'optimizer': config.optimizer,
+            'scheduler': config.scheduler,
+            'sample_prompt': config.sample_prompt,
+            'sample_every_n_steps': config.sample_every_n_steps,
+            'save_every_n_epochs': config.save_every_n_epochs,
+            'gpu_ids': config.gpu_ids,
+            'max_data_loader_n_workers': config.max_data_loader_n_workers,
+            'persistent_data_loader_workers': config.persistent_data_loader_workers,
+            'seed': config.seed,
+        }
+        self._config_dicts[task.id] = (task.config, config_data)
+        return config_data
+
+    def _open_task_db(self) -> sqlite3.Connection:
+        """打开任务数据库，WAL模式下读取不会阻塞写入"""
         try:
-            for task_file in self.tasks_dir.glob("*.json"):
-                try:
-                    with open(task_file, 'r', encoding='utf-8') as f:
-                        task_data = json.load(f)
-
-                    # 重构配置对象
-                    config_data = task_data['config']
-                    config = TrainingConfig(
-                        name=config_data['name'],
-                        training_type=TrainingType(
-                            config_data.get('training_type', config_data.get('type', 'qwen_image_lora'))),
-                        dataset_id=config_data['dataset_id'],
-                        task_id=config_data.get('task_id', ''),
-                        epochs=config_data.get('epochs', 16),
-                        batch_size=config_data.get('batch_size', 1),
-                        learning_rate=config_data.get('learning_rate', 1e-4),
-                        resolution=config_data.get('resolution', '1024,1024'),
-                        network_dim=config_data.get('network_dim', 32),
-                        network_alpha=config_data.get('network_alpha', 16),
-                        repeats=config_data.get('repeats', 1),
-                        dataset_size=config_data.get('dataset_size', 0),
-                        enable_bucket=config_data.get('enable_bucket', True),
-                        optimizer=config_data.get('optimizer', 'adamw'),
-                        scheduler=config_data.get('scheduler', 'cosine'),
-                        sample_prompt=config_data.get('sample_prompt', ''),
-                        sample_every_n_steps=config_data.get('sample_every_n_steps', 200),
-                        save_every_n_epochs=config_data.get('save_every_n_epochs', 1),
-                        gpu_ids=config_data.get('gpu_ids', [0]),
-                        max_data_loader_n_workers=config_data.get('max_data_loader_n_workers', 2),
-                        persistent_data_loader_workers=config_data.get('persistent_data_loader_workers', True),
-                        seed=config_data.get('seed', 42),
-                    )
+            conn = sqlite3.connect(str(self.tasks_dir / "tasks.db"), check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS tasks (
+                    id TEXT PRIMARY KEY,
+                    data BLOB NOT NULL,
+                    updated REAL NOT NULL
+                )
+            ''')
+            conn.commit()
+            return conn
+        except Exception as e:
+            log_error(f"打开任务数据库失败: {e}")
+            raise TrainingError(f"打开任务数据库失败: {e}")
 
-                    # 重构任务对象
-                    task = TrainingTask(
-                        id=task_data['id'],
-                        name=task_data['name'],
-                        config=config,
-                        state=TrainingState(task_data['state']),
-                        progress=task_data.get('progress', 0.0),
-                        created_at=datetime.fromisoformat(task_data['created_at']),
-                        started_at=datetime.fromisoformat(task_data['started_at']) if task_data.get(
-                            'started_at') else None,
-                        completed_at=datetime.fromisoformat(task_data['completed_at']) if task_data.get(
-                            'completed_at') else None,
-                        logs=task_data.get('logs', [])
-                    )
+    def load_tasks(self) -> None:
+        """从数据库加载训练任务"""
+        try:
+            self._migrate_json_tasks()
+            self._remove_legacy_wal_files()
 
-                    self.tasks[task.id] = task
+            with self._db_lock:
+                rows = self._db.execute('SELECT id, data FROM tasks').fetchall()
+            loaded = [self._load_task_row(task_id, data) for task_id, data in rows]
 
-                except Exception as e:
-                    log_error(f"加载任务文件失败 {task_file}: {e}")
-                    continue
+            with self._tasks_lock:
+                self.tasks.update((task.id, task) for task in loaded if task is not None)
+                count = len(self.tasks)
 
-            log_info(f"加载了 {len(self.tasks)} 个训练任务")
+            log_info(f"加载了 {count} 个训练任务")
 
         except Exception as e:
             log_error(f"加载训练任务失败: {e}")
 
+    def _remove_legacy_wal_files(self) -> None:
+        """删除旧版本遗留的进度WAL文件（进度现已直接写入数据库）"""
+        for pattern in ('*.wal.mp', '*.wal.jsonl'):
+            for wal_file in self.tasks_dir.glob(pattern):
+                try:
+                    wal_file.unlink()
+                except OSError as e:
+                    log_error(f"删除旧版WAL文件失败 {wal_file}: {e}")
+
+    def _load_task_row(self, task_id: str, data: bytes) -> Optional[TrainingTask]:
+        """解析一条任务快照"""
+        try:
+            task = TrainingTask.from_dict(_load_json_bytes(data))
+            # 训练队列只存在于内存中，上次退出时仍在排队的任务恢复为待开始
+            if task.state == TrainingState.QUEUED:
+                task.state = TrainingState.PENDING
+            return task
+
+        except Exception as e:
+            log_error(f"加载训练任务失败 {task_id}: {e}")
+            return None
+
+    def _migrate_json_tasks(self) -> None:
+        """将旧版 tasks/<id>.json 导入数据库，导入后重命名为 .json.migrated"""
+        task_files = list(self.tasks_dir.glob("*.json"))
+        if not task_files:
+            return
+        if len(task_files) == 1:
+            contents = [self._read_legacy_task_file(task_files[0])]
+        else:
+            with ThreadPoolExecutor(max_workers=min(_LOAD_WORKERS, len(task_files))) as executor:
+                contents = list(executor.map(self._read_legacy_task_file, task_files))
+
+        now = time.time()
+        migrated = [(f, c) for f, c in zip(task_files, contents) if c is not None]
+        with self._db_lock:
+            # 数据库中已有的任务以数据库为准
+            self._db.executemany(
+                'INSERT OR IGNORE INTO tasks (id, data, updated) VALUES (?, ?, ?)',
+                [(task_id, raw, now) for _, (task_id, raw) in migrated]
+            )
+            self._db.commit()
+
+        for task_file, _ in migrated:
+            try:
+                task_file.rename(task_file.with_name(task_file.name + '.migrated'))
+            except OSError as e:
+                log_error(f"重命名已迁移的任务文件失败 {task_file}: {e}")
+        log_info(f"已将 {len(migrated)} 个任务文件迁移到数据库")
+
+    def _read_legacy_task_file(self, task_file: Path) -> Optional[Tuple[str, bytes]]:
+        """读取旧版任务文件，返回 (任务ID, 原始内容)"""
+        try:
+            raw = task_file.read_bytes()
+            return _load_json_bytes(raw)['id'], raw
+        except Exception as e:
+            log_error(f"读取任务文件失败 {task_file}: {e}")
+            return None
+
     def _on_progress(self, task_id: str, progress_info: Dict[str, Any]) -> None:
         """训练进度回调"""
         task = self.get_task(task_id)
         if task:
             # 更新任务进度信息
-            if 'progress' in progress_info:
-                task.progress = progress_info['progress']
-            if 'step' in progress_info:
-                task.current_step = progress_info['step']
-            if 'total_steps' in progress_info:
-                task.total_steps = progress_info['total_steps']
-            if 'epoch' in progress_info:
-                task.current_epoch = progress_info['epoch']
-            if 'loss' in progress_info:
-                task.loss = progress_info['loss']
-            if 'lr' in progress_info:
-                task.learning_rate = progress_info['lr']
-            if 'speed' in progress_info:
-                task.speed = progress_info['speed']
-            if 'eta_seconds' in progress_info:
-                task.eta_seconds = progress_info['eta_seconds']
-                
-            self.save_task(task)
+            for key, attr in _PROGRESS_FIELDS:
+                value = progress_info.get(key, _MISSING)
+                if value is not _MISSING:
+                    setattr(task, attr, value)
+
+            # 训练输出没有ETA时才使用估算值，训练器报告的ETA（包括最后一步的0）原样保留
+            eta = None
+            if 'step' in progress_info and progress_info.get('eta_seconds') is None:
+                eta = self._estimate_eta(task)
+                if eta is not None:
+                    task.eta_seconds = eta
+
+            if self._should_persist_progress(task):
+                self.save_task(task)
             
-            # 发送进度事件
+            # 发送进度事件（步数变化很小且间隔很短时跳过）
+            if 'step' in progress_info and not self._should_emit_progress(task):
+                return
             event_data = {'task_id': task_id}
             event_data.update(progress_info)
+            if eta is not None:
+                event_data['eta_seconds'] = eta
             self._emit_event('task_progress', event_data)
 
+    def _should_emit_progress(self, task: TrainingTask) -> bool:
+        """步数前进约0.2%、距上次发送超过阈值或到达最后一步时才发送进度事件"""
+        now = time.monotonic()
+        step, total = task.current_step, task.total_steps
+        last = self._last_emit.get(task.id)
+        if last is not None and step < total:
+            last_step, last_ts = last
+            if (step - last_step < max(1, total // 500)
+                    and now - last_ts < _PROGRESS_EMIT_INTERVAL):
+                return False
+        self._last_emit[task.id] = (step, now)
+        return True
+
+    def _estimate_eta(self, task: TrainingTask) -> Optional[int]:
+        """根据最近一段窗口内的平均速度估算ETA（秒），比单次采样外推更稳定；无法估算时返回None"""
+        now = time.monotonic()
+        step = task.current_step
+        window = self._speed_window.get(task.id)
+        if window is None or (window and step < window[-1][1]):
+            # 首次采样或步数回退（重新开始），重建窗口
+            window = deque(maxlen=_SPEED_WINDOW_SIZE)
+            self._speed_window[task.id] = window
+            self._speed_ewma.pop(task.id, None)
+        window.append((now, step))
+        if len(window) < 2 or task.total_steps <= 0:
+            return None
+
+        t0, s0 = window[0]
+        sps = (step - s0) / max(1e-3, now - t0)
+        if sps <= 0:
+            return None
+        prev = self._speed_ewma.get(task.id)
+        if prev is not None:
+            sps = _SPEED_EWMA_ALPHA * sps + (1 - _SPEED_EWMA_ALPHA) * prev
+        self._speed_ewma[task.id] = sps
+
+        return int(max(0, task.total_steps - step) / sps)
+
+    def _drop_speed_window(self, task_id: str) -> None:
+        """任务结束后释放速度采样窗口以及进度事件和持久化的节流状态"""
+        self._speed_window.pop(task_id, None)
+        self._speed_ewma.pop(task_id, None)
+        self._last_emit.pop(task_id, None)
+        self._last_persisted.pop(task_id, None)
+
     def _on_log(self, task_id: str, message: str) -> None:
-        """训练日志回调"""
+        """训练日志回调，连续重复的日志行折叠为 "[xN] 内容" """
+        task = self.get_task(task_id)
+        if task:
+            h = hash(message)
+            now = time.monotonic()
+            last = self._log_repeat.get(task_id)
+            if last is not None and last[0] == h and last[1] == message:
+                repeat = last[2] + 1
+                # 重复期间每隔一段时间仍输出一次计数，避免长时间无日志
+                if now - last[3] < _LOG_REPEAT_FLUSH_INTERVAL:
+                    self._log_repeat[task_id] = (h, message, repeat, last[3])
+                    return
+                self._log_repeat[task_id] = (h, message, 0, now)
+                self._append_log(task_id, task, f"[x{repeat}] {message}")
+                return
+
+            self._flush_log_repeat(task_id)
+            self._log_repeat[task_id] = (h, message, 0, now)
+            self._append_log(task_id, task, message)
+
+    def _flush_log_repeat(self, task_id: str) -> None:
+        """输出尚未写出的重复日志计数"""
+        last = self._log_repeat.pop(task_id, None)
+        if last is None or last[2] == 0:
+            return
         task = self.get_task(task_id)
         if task:
-            timestamp = datetime.now().isoformat()
-            log_entry = f"[{timestamp}] {message}"
-            task.logs.append(log_entry)
+            self._append_log(task_id, task, f"[x{last[2]}] {last[1]}")
 
-            # 限制内存中的日志数量
-            if len(task.logs) > 1000:
-                task.logs = task.logs[-1000:]
+    def _append_log(self, task_id: str, task: TrainingTask, message: str) -> None:
+        """记录一行日志到内存、实时日志文件并通知订阅者"""
+        timestamp = datetime.now().isoformat()
+        log_entry = f"[{timestamp}] {message}"
+        task.logs.append(log_entry)
 
-            # 保存到任务文件
-            self.save_task(task)
-            
-            # 同时写入实时日志文件（追加模式）
-            try:
-                self._write_log_to_file(task_id, log_entry)
-            except Exception as e:
-                log_error(f"写入日志文件失败: {e}")
-            
+        # 限制内存中的日志数量
+        if len(task.logs) > 1000:
+            task.logs = task.logs[-1000:]
+
+        # 日志本身已写入实时日志文件，内存中的日志尾部由快照线程定期落盘
+        with self._db_lock:
+            self._logs_dirty.add(task_id)
+
+        # 写入实时日志文件（追加模式）
+        try:
+            self._write_log_to_file(task_id, log_entry)
+        except Exception as e:
+            log_error(f"写入日志文件失败: {e}")
+
+        # 没有订阅者时不构造事件数据
+        if self.callbacks.get('task_log'):
             self._emit_event('task_log', {'task_id': task_id, 'message': log_entry})
-    
+
+        # 批量日志事件只由分发线程发送（保证批次顺序）：攒够一定行数时通知分发线程，否则定时发送
+        if self.callbacks.get('task_log_batch'):
+            with self._log_lock:
+                buffer = self._log_buffer.setdefault(task_id, [])
+                buffer.append(log_entry)
+                full = len(buffer) == _LOG_BATCH_LINES
+            if full:
+                self._event_queue.put_nowait((_LOG_FLUSH_EVENT, None))
+
+    def _flush_log_batches(self) -> None:
+        """分发线程：发送全部待发送的日志行，每批最多_LOG_BATCH_LINES行"""
+        with self._log_lock:
+            buffers, self._log_buffer = self._log_buffer, {}
+        for task_id, lines in buffers.items():
+            for start in range(0, len(lines), _LOG_BATCH_LINES):
+                self._dispatch_event('task_log_batch', {
+                    'task_id': task_id, 'lines': lines[start:start + _LOG_BATCH_LINES]
+                })
+
+    def _should_persist_progress(self, task: TrainingTask) -> bool:
+        """进度前进足够多、状态变化或距上次写入过久时才需要持久化"""
+        now = time.monotonic()
+        last = self._last_persisted.get(task.id)
+        if last is not None:
+            last_progress, last_state, last_ts = last
+            if (task.state == last_state
+                    and task.progress - last_progress < _PERSIST_PROGRESS_EPSILON
+                    and now - last_ts < _PERSIST_MAX_INTERVAL):
+                return False
+        self._last_persisted[task.id] = (task.progress, task.state, now)
+        return True
+
+    def _snapshot_loop(self) -> None:
+        """后台线程：定期保存有新日志的任务快照"""
+        while True:
+            time.sleep(_SNAPSHOT_INTERVAL)
+            with self._db_lock:
+                pending = set(self._logs_dirty)
+            for task_id in pending:
+                task = self.get_task(task_id)
+                if task:
+                    self.save_task(task)
+
     def _write_log_to_file(self, task_id: str, log_entry: str) -> None:
         """将日志写入实时日志文件"""
-        from pathlib import Path
-        
-        # 创建日志目录
-        log_dir = Path(self.config.storage.workspace_root) / "trainings" / task_id / "logs"
-        log_dir.mkdir(parents=True, exist_ok=True)
+        fh = self._log_handles.get(task_id)
+        if fh is None:
+            # 创建日志目录
+            log_dir = Path(self.config.storage.workspace_root) / "trainings" / task_id / "logs"
+            log_dir.mkdir(parents=True, exist_ok=True)
+            fh = open(log_dir / "training_realtime.log", 'a', encoding='utf-8', buffering=1)
+            self._log_handles[task_id] = fh
         
-        # 日志文件路径
-        log_file = log_dir / "training_realtime.log"
-        
-        # 追加写入日志
-        with open(log_file, 'a', encoding='utf-8') as f:
-            f.write(log_entry + '\n')
-            f.flush()  # 强制刷新缓冲区
+        # 追加写入日志（行缓冲，每行写完即落到系统缓冲区）
+        fh.write(log_entry + '\n')
+
+    def _close_log(self, task_id: str) -> None:
+        """关闭任务的实时日志文件句柄"""
+        self._log_repeat.pop(task_id, None)
+        fh = self._log_handles.pop(task_id, None)
+        if fh is not None:
+            try:
+                fh.close()
+            except Exception as e:
+                log_error(f"关闭日志文件失败: {e}")
 
     def _emit_event(self, event: str, data: Dict[str, Any]) -> None:
-        """发送事件"""
-        callbacks = self.callbacks.get(event, [])
-        for callback in callbacks:
+        """发送事件（放入分发队列，所有回调都由分发线程按顺序调用）"""
+        if not self.callbacks.get(event):
+            return
+        if event in _COALESCED_EVENTS:
+            # 同一任务的进度事件尚未分发时只更新数据，不再重复入队
+            key = (event, data.get('task_id'))
+            with self._pending_lock:
+                queued = key in self._pending_events
+                self._pending_events[key] = data
+            if not queued:
+                self._event_queue.put_nowait((event, key))
+            return
+        self._event_queue.put_nowait((event, data))
+
+    def _event_pump(self) -> None:
+        """后台线程：依次分发队列中的事件，并按行数或时间间隔发送批量日志"""
+        last_flush = time.monotonic()
+        while True:
+            flush = False
+            try:
+                event, data = self._event_queue.get(timeout=_LOG_BATCH_INTERVAL)
+                if event == _LOG_FLUSH_EVENT:
+                    flush = True
+                else:
+                    if event in _COALESCED_EVENTS:
+                        with self._pending_lock:
+                            data = self._pending_events.pop(data)
+                    self._dispatch_event(event, data)
+            except Empty:
+                pass
+            # 不等队列清空：事件持续到达时批量日志也按时间间隔发送
+            now = time.monotonic()
+            if flush or now - last_flush >= _LOG_BATCH_INTERVAL:
+                last_flush = now
+                self._flush_log_batches()
+
+    def _dispatch_event(self, event: str, data: Dict[str, Any]) -> None:
+        """调用事件回调"""
+        for callback in self.callbacks.get(event, ()):
             try:
                 callback(data)
             except Exception as e:
@@ -386,14 +776,13 @@ class TrainingManager:
 
     def add_callback(self, event: str, callback: Callable) -> None:
         """添加事件回调"""
-        if event not in self.callbacks:
-            self.callbacks[event] = []
-        self.callbacks[event].append(callback)
+        with self._cb_lock:
+            self.callbacks[event] = self.callbacks.get(event, ()) + (callback,)
 
     def remove_callback(self, event: str, callback: Callable) -> None:
         """移除事件回调"""
-        if event in self.callbacks:
-            try:
-                self.callbacks[event].remove(callback)
-            except ValueError:
-                pass
+        with self._cb_lock:
+            callbacks = self.callbacks.get(event)
+            if callbacks and callback in callbacks:
+                index = callbacks.index(callback)
+                self.callbacks[event] = callbacks[:index] + callbacks[index + 1:]
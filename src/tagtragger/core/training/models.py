@@ -2,7 +2,8 @@
 Training models and configurations
 """
 
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, fields, MISSING
+from types import MappingProxyType
 from typing import Dict, Any, Optional, List
 from enum import Enum
 from datetime import datetime
@@ -10,6 +11,7 @@ from datetime import datetime
 class TrainingState(Enum):
     """训练状态"""
     PENDING = "pending"
+    QUEUED = "queued"
     PREPARING = "preparing"
     RUNNING = "running"
     COMPLETED = "completed"
@@ -22,7 +24,7 @@ class TrainingType(Enum):
     FLUX_LORA = "flux_lora"
     SD_LORA = "sd_lora"
 
-@dataclass
+@dataclass(slots=True)
 class QwenImageConfig:
     """Qwen-Image训练特定配置"""
     dit_path: str = ""
@@ -41,7 +43,7 @@ class QwenImageConfig:
     split_attn: bool = False
     attention_type: str = "sdpa"  # sdpa, xformers, flash_attn
 
-@dataclass
+@dataclass(slots=True)
 class TrainingConfig:
     """训练配置"""
     # 基础配置
@@ -94,11 +96,33 @@ class TrainingConfig:
         """向后兼容的type属性"""
         return self.training_type
     
-    def __post_init__(self):
-        if isinstance(self.training_type, str):
-            self.training_type = TrainingType(self.training_type)
+    @classmethod
+    def from_dict(cls, data: dict) -> 'TrainingConfig':
+        """从字典创建，忽略未知字段，缺失字段使用默认值"""
+        get = data.get
+        # 按字段顺序构造位置参数，避免创建关键字参数字典
+        args = []
+        for name, default, factory in _CONFIG_FIELD_DEFAULTS:
+            value = get(name, MISSING)
+            if value is MISSING:
+                if name == 'training_type':
+                    # 兼容旧版本的type字段
+                    value = get('type', TrainingType.QWEN_IMAGE_LORA.value)
+                elif default is not MISSING:
+                    value = default
+                elif factory is not MISSING:
+                    value = factory()
+                else:
+                    raise TypeError(f"缺少训练配置字段: {name}")
+            args.append(value)
+        # 字典中的枚举值和嵌套配置在这里转换，直接构造时调用方传入的已是对应类型
+        args[_TRAINING_TYPE_INDEX] = TrainingType(args[_TRAINING_TYPE_INDEX])
+        qwen_config = args[_QWEN_CONFIG_INDEX]
+        if isinstance(qwen_config, dict):
+            args[_QWEN_CONFIG_INDEX] = QwenImageConfig(**qwen_config)
+        return cls(*args)
 
-@dataclass  
+@dataclass(slots=True)
 class TrainingTask:
     """训练任务"""
     id: str  # 使用id而不是task_id，保持与TrainingManager一致
@@ -128,11 +152,34 @@ class TrainingTask:
         if self.created_at is None:
             self.created_at = datetime.now()
     
+    @classmethod
+    def from_dict(cls, data: dict) -> 'TrainingTask':
+        """从任务文件的字典创建"""
+        return cls(
+            id=data['id'],
+            name=data['name'],
+            config=TrainingConfig.from_dict(data['config']),
+            state=TrainingState(data['state']),
+            progress=data.get('progress', 0.0),
+            current_step=data.get('current_step', 0),
+            total_steps=data.get('total_steps', 0),
+            current_epoch=data.get('current_epoch', 0),
+            loss=data.get('loss', 0.0),
+            learning_rate=data.get('learning_rate', 0.0),
+            eta_seconds=data.get('eta_seconds'),
+            speed=data.get('speed'),
+            created_at=datetime.fromisoformat(data['created_at']),
+            started_at=datetime.fromisoformat(data['started_at']) if data.get('started_at') else None,
+            completed_at=datetime.fromisoformat(data['completed_at']) if data.get('completed_at') else None,
+            logs=data.get('logs', []),
+            error_message=data.get('error_message', "")
+        )
+    
     @property
     def created_time(self) -> str:
         """向后兼容的created_time属性"""
         if self.created_at:
-            return self.created_at.strftime('%Y-%m-%d %H:%M:%S')
+            return self.created_at.isoformat(sep=' ', timespec='seconds')
         return ""
     
     @property
@@ -141,7 +188,13 @@ class TrainingTask:
         return self.id
 
 
-@dataclass
+# TrainingConfig的 (字段名, 默认值, 默认工厂) 按定义顺序排列，用于from_dict按位置构造
+_CONFIG_FIELD_DEFAULTS = tuple((f.name, f.default, f.default_factory) for f in fields(TrainingConfig))
+_TRAINING_TYPE_INDEX = next(i for i, f in enumerate(_CONFIG_FIELD_DEFAULTS) if f[0] == 'training_type')
+_QWEN_CONFIG_INDEX = next(i for i, f in enumerate(_CONFIG_FIELD_DEFAULTS) if f[0] == 'qwen_config')
+
+
+@dataclass(slots=True)
 class FluxConfig:
     """Flux模型特定配置"""
     dit_path: str = ""
@@ -151,7 +204,7 @@ class FluxConfig:
     mixed_precision: str = "bf16"
     guidance_scale: float = 3.5
     
-@dataclass
+@dataclass(slots=True)
 class StableDiffusionConfig:
     """Stable Diffusion模型特定配置"""
     unet_path: str = ""
@@ -202,3 +255,16 @@ TRAINING_PRESETS = {
         }
     }
 }
+
+# 预先将默认参数展开为命令行参数序列，并冻结预设防止运行时被修改
+for _preset in TRAINING_PRESETS.values():
+    _preset["cli_args"] = tuple(
+        arg
+        for key, value in _preset["default_args"].items()
+        for arg in ((key,) if value is None else (key, str(value)))  # None 表示flag参数
+    )
+    _preset["default_args"] = MappingProxyType(_preset["default_args"])
+TRAINING_PRESETS = MappingProxyType({
+    training_type: MappingProxyType(preset) for training_type, preset in TRAINING_PRESETS.items()
+})
+del _preset
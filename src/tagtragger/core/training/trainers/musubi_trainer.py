@@ -5,20 +5,30 @@
 
 import os
 import sys
+import hashlib
 import time
 import subprocess
 import signal
 import uuid
 import tempfile
-import toml
 import json
 import platform
 import re
+import select
+import shlex
 import shutil
-import psutil
-from pathlib import Path
-from typing import Callable, Optional, Dict, Any, List
-from dataclasses import asdict
+import threading
+from pathlib import Path, PurePath
+from queue import Queue, Empty, Full
+from typing import Callable, Optional, Dict, Any, List, Tuple
+from dataclasses import fields
+from functools import cached_property, lru_cache
+
+try:
+    # orjson 为可选依赖，未安装时回退到标准库json
+    import orjson
+except ImportError:
+    orjson = None
 
 from ...common.events import EventBus, Job
 from ....utils.logger import log_info, log_error, log_success, log_progress
@@ -26,6 +36,173 @@ from ....utils.exceptions import TrainingError
 from ....config import get_config
 from ..models import TrainingConfig, TrainingTask, TrainingType, TrainingState, TRAINING_PRESETS
 
+# 训练输出解析用的正则，模块加载时编译一次；所有字段合并为一个分支模式，一次扫描提取
+# loss和lr不区分大小写，其余字段区分大小写
+_RE_PROGRESS = re.compile(
+    r'Epoch (?P<epoch>\d+)/(?P<total_epochs>\d+)'
+    r'|Step (?P<step>\d+)/(?P<total_steps>\d+)'
+    r'|(?i:loss:?\s*(?P<loss>[\d.]+))'
+    r'|(?i:lr:?\s*(?P<lr>[\d.e-]+))'
+    r'|(?P<speed>[\d.]+)\s*it/s'
+    r'|ETA:?\s*(?P<eta_h>\d{2}):(?P<eta_m>\d{2}):(?P<eta_s>\d{2})'
+)
+
+# 快速过滤：行内不含任何进度关键字时无需执行完整解析（loss和lr不区分大小写）
+_RE_PROGRESS_HINT = re.compile(r'Epoch |Step |it/s|ETA|(?i:loss|lr)')
+
+# 进度回调的最短间隔（秒）
+_PROGRESS_CALLBACK_INTERVAL = 0.25
+
+# 输出读取线程与监控循环之间的队列容量（满时读取线程等待，形成背压）
+_OUTPUT_QUEUE_SIZE = 1024
+
+# 取消训练后等待进程自行退出的时间（秒），超时由监控循环强制终止整个进程组
+_CANCEL_KILL_TIMEOUT = 10.0
+
+# 单个预处理缓存步骤的超时时间（秒）
+_CACHE_STEP_TIMEOUT = 1800
+
+# is_available 检查结果的缓存时间（秒）
+_AVAILABLE_CACHE_TTL = 60.0
+
+# 训练进程输出每次读取的块大小
+_PIPE_BUFSIZE = 65536
+
+
+# 运行平台在进程内不会变化，导入时确定一次
+_IS_WINDOWS = os.name == 'nt'
+_PLATFORM_NAME = platform.system()
+
+# Linux 5.3+ 可通过pidfd等待进程退出，无需轮询
+_HAS_PIDFD = hasattr(os, 'pidfd_open')
+
+
+def _wait_process_exit(proc: subprocess.Popen, timeout: float) -> bool:
+    """等待进程退出，返回进程是否已退出；支持pidfd时进程一退出立即返回"""
+    if _HAS_PIDFD:
+        try:
+            pidfd = os.pidfd_open(proc.pid)
+        except OSError:
+            # 进程已被回收
+            return True
+        try:
+            select.select([pidfd], [], [], timeout)
+        finally:
+            os.close(pidfd)
+        return proc.poll() is not None
+    try:
+        proc.wait(timeout)
+        return True
+    except subprocess.TimeoutExpired:
+        return False
+
+
+def _put_output(lines: Queue, item: Optional[str], stop: Optional[threading.Event]) -> bool:
+    """放入输出队列；队列满时定时检查停止标志，监控循环已退出则放弃并返回False"""
+    if stop is None:
+        lines.put(item)
+        return True
+    while not stop.is_set():
+        try:
+            lines.put(item, timeout=_PROGRESS_CALLBACK_INTERVAL)
+            return True
+        except Full:
+            pass
+    return False
+
+
+# 已确认存在的路径（模型文件、运行时目录）-> 确认时间，只缓存存在的结果，
+# 这样用户补齐缺失文件后重试即可生效；超过有效期后重新检查，文件被删除时也能发现
+_EXISTING_PATHS: Dict[str, float] = {}
+_PATH_EXISTS_TTL = 30.0
+
+
+def _path_exists(path) -> bool:
+    """检查路径是否存在，存在的结果在短时间内缓存以避免重复stat"""
+    if not path:
+        return False
+    key = str(path)
+    now = time.monotonic()
+    checked = _EXISTING_PATHS.get(key)
+    if checked is not None and now - checked < _PATH_EXISTS_TTL:
+        return True
+    if os.path.exists(key):
+        _EXISTING_PATHS[key] = now
+        return True
+    _EXISTING_PATHS.pop(key, None)
+    return False
+
+
+@lru_cache(maxsize=None)
+def _project_root() -> Path:
+    """项目根目录，进程内不会变化，只计算一次"""
+    return Path(__file__).parent.parent.parent.parent.parent.parent
+
+
+@lru_cache(maxsize=None)
+def _field_names(cls) -> Tuple[str, ...]:
+    """数据类的字段名，按类型缓存"""
+    return tuple(f.name for f in fields(cls))
+
+
+def _shallow_asdict(obj) -> Optional[Dict[str, Any]]:
+    """浅层转换扁平数据类为字典，字段均为基本类型时避免asdict的递归深拷贝"""
+    if obj is None:
+        return None
+    return {name: getattr(obj, name) for name in _field_names(type(obj))}
+
+
+# 数据集TOML模板（只包含musubi支持的字段）
+_DATASET_TOML_TEMPLATE = """# TagTracker 生成的数据集配置文件
+[general]
+resolution = [{width}, {height}]
+caption_extension = ".txt"
+batch_size = {batch_size}
+enable_bucket = {enable_bucket}
+bucket_no_upscale = false
+
+[[datasets]]
+image_directory = {image_directory}
+cache_directory = {cache_directory}
+num_repeats = {num_repeats}
+"""
+
+
+@lru_cache(maxsize=128)
+def _render_dataset_toml(width: int, height: int, batch_size: int, enable_bucket: bool,
+                         image_directory: str, cache_directory: str, num_repeats: int) -> str:
+    """生成数据集TOML内容，相同参数直接复用结果"""
+    # 路径按TOML基本字符串转义（与JSON字符串转义规则兼容），含引号或反斜杠时也能生成合法文件
+    return _DATASET_TOML_TEMPLATE.format_map({
+        'width': width,
+        'height': height,
+        'batch_size': batch_size,
+        'enable_bucket': 'true' if enable_bucket else 'false',
+        'image_directory': json.dumps(image_directory, ensure_ascii=False),
+        'cache_directory': json.dumps(cache_directory, ensure_ascii=False),
+        'num_repeats': num_repeats,
+    })
+
+
+@lru_cache(maxsize=64)
+def _qwen_optional_args(gradient_checkpointing: bool, fp8_base: bool, fp8_scaled: bool,
+                        fp8_vl: bool, blocks_to_swap: int, split_attn: bool) -> Tuple[str, ...]:
+    """根据Qwen-Image开关组合生成可选命令行参数"""
+    args: List[str] = []
+    if gradient_checkpointing:
+        args.append("--gradient_checkpointing")
+    if fp8_base:
+        args.append("--fp8_base")
+    if fp8_scaled:
+        args.append("--fp8_scaled")
+    if fp8_vl:
+        args.append("--fp8_vl")
+    if blocks_to_swap > 0:
+        args.extend(["--blocks_to_swap", str(blocks_to_swap)])
+    if split_attn:
+        args.append("--split_attn")
+    return tuple(args)
+
 
 class MusubiTrainer:
     """统一的Musubi-Tuner训练器"""
@@ -34,7 +211,22 @@ class MusubiTrainer:
         self.bus = bus
         self.config = get_config()
         self._proc: Optional[subprocess.Popen] = None
+        # 取消训练后强制终止进程的期限（monotonic时间），未取消时为None
+        self._cancel_deadline: Optional[float] = None
+        # 本次训练输出中最近解析到的ETA（秒），未解析到时为None；
+        # 任务的eta_seconds可能已被管理器写入估算值，不能作为训练器报告的ETA
+        self._reported_eta: Optional[int] = None
         self._id = uuid.uuid4().hex
+        # 已创建的训练工作空间 {task_id: training_dir}
+        self._workspaces: Dict[str, Path] = {}
+        # 已确认存在的musubi-tuner目录、accelerate命令和各训练类型的脚本路径
+        self._musubi_dir: Optional[Path] = None
+        self._accelerate_cmd: Optional[Tuple[str, ...]] = None
+        self._script_paths: Dict[TrainingType, str] = {}
+        # 每个任务最近一次生成的训练命令，用于按需导出启动脚本
+        self._launch_commands: Dict[str, List[str]] = {}
+        # is_available 的 (检查时间, 结果) 缓存
+        self._available_cache: Optional[Tuple[float, bool]] = None
         
         # 注册程序退出时的清理函数
         import atexit
@@ -42,30 +234,42 @@ class MusubiTrainer:
         
     def get_runtime_path(self) -> Path:
         """获取训练运行时环境路径"""
-        project_root = Path(__file__).parent.parent.parent.parent.parent.parent
-        runtime_dir = project_root / "runtime"
+        runtime_dir = _project_root() / "runtime"
         
-        if not runtime_dir.exists():
+        if not _path_exists(runtime_dir):
             raise TrainingError("训练运行时环境不存在，请检查runtime目录")
         
         return runtime_dir
     
     def get_musubi_path(self) -> Path:
-        """获取内嵌的musubi-tuner路径"""
+        """获取内嵌的musubi-tuner路径（找到后缓存）"""
+        if self._musubi_dir is not None:
+            return self._musubi_dir
+        
         runtime_dir = self.get_runtime_path()
         musubi_dir = runtime_dir / "engines" / "musubi-tuner"
         
-        if not musubi_dir.exists():
+        if not _path_exists(musubi_dir):
             raise TrainingError("Musubi-Tuner引擎不存在，请检查runtime/engines/musubi-tuner目录")
         
+        self._musubi_dir = musubi_dir
         return musubi_dir
     
+    @cached_property
+    def _musubi_resolved(self) -> Path:
+        """解析后的musubi-tuner绝对路径"""
+        return self.get_musubi_path().resolve()
+    
+    def _relpath_to_musubi(self, path) -> str:
+        """计算相对于musubi工作目录的路径，统一使用/作为分隔符"""
+        return PurePath(os.path.relpath(Path(path).resolve(), self._musubi_resolved)).as_posix()
+    
     def get_runtime_python(self) -> Path:
         """获取runtime中的嵌入式Python解释器路径"""
         runtime_dir = self.get_runtime_path()
         python_exe = runtime_dir / "python" / "python.exe"
         
-        if not python_exe.exists():
+        if not _path_exists(python_exe):
             raise TrainingError(
                 f"嵌入式Python环境未安装: {python_exe}\n"
                 f"请确保runtime/python/目录包含完整的Python环境"
@@ -74,13 +278,19 @@ class MusubiTrainer:
         return python_exe
     
     def _get_accelerate_cmd(self) -> List[str]:
-        """获取正确的accelerate命令，使用runtime Python环境"""
-        # 使用runtime Python环境中的accelerate
-        runtime_python = self.get_runtime_python()
-        return [str(runtime_python), "-m", "accelerate"]
+        """获取正确的accelerate命令，使用runtime Python环境（解析一次后缓存）"""
+        if self._accelerate_cmd is None:
+            # 使用runtime Python环境中的accelerate
+            runtime_python = self.get_runtime_python()
+            self._accelerate_cmd = (str(runtime_python), "-m", "accelerate")
+        return list(self._accelerate_cmd)
         
     def _get_script_path(self, training_type: TrainingType) -> str:
-        """获取训练脚本路径（相对于musubi目录）"""
+        """获取训练脚本路径（相对于musubi目录），确认存在后按训练类型缓存"""
+        script = self._script_paths.get(training_type)
+        if script is not None:
+            return script
+        
         if training_type not in TRAINING_PRESETS:
             raise TrainingError(f"不支持的训练类型: {training_type}")
             
@@ -88,31 +298,39 @@ class MusubiTrainer:
         musubi_dir = self.get_musubi_path()
         script_path = musubi_dir / preset["script_path"]
         
-        if not script_path.exists():
+        if not _path_exists(script_path):
             raise TrainingError(f"训练脚本不存在: {script_path}")
             
         # 返回相对路径（相对于musubi目录）
+        self._script_paths[training_type] = preset["script_path"]
         return preset["script_path"]
     
     def _create_training_workspace(self, task: TrainingTask) -> Path:
-        """创建训练工作空间目录"""
+        """创建训练工作空间目录，同一任务只创建一次"""
+        training_dir = self._workspaces.get(task.id)
+        if training_dir is not None:
+            return training_dir
+        
         workspace_root = Path(self.config.storage.workspace_root)
         training_dir = workspace_root / "trainings" / task.id
-        training_dir.mkdir(parents=True, exist_ok=True)
         
-        # 创建子目录
-        (training_dir / "logs").mkdir(exist_ok=True)
+        # 创建子目录（parents=True 时会顺带创建训练目录本身）
+        (training_dir / "logs").mkdir(parents=True, exist_ok=True)
         (training_dir / "cache").mkdir(exist_ok=True)
         
+        self._workspaces[task.id] = training_dir
         return training_dir
     
-    def _create_dataset_config(self, task: TrainingTask) -> str:
-        """创建Musubi数据集配置文件（dataset.toml）"""
-        # 获取数据集路径 - 使用绝对路径
+    def _dataset_path(self, task: TrainingTask) -> Path:
+        """获取数据集图像目录的绝对路径，目录不存在时报错"""
         dataset_path = Path(self.config.storage.workspace_root).resolve() / "datasets" / task.config.dataset_id / "original"
-        
         if not dataset_path.exists():
             raise TrainingError(f"数据集路径不存在: {dataset_path}")
+        return dataset_path
+    
+    def _create_dataset_config(self, task: TrainingTask) -> str:
+        """创建Musubi数据集配置文件（dataset.toml）"""
+        dataset_path = self._dataset_path(task)
         
         # 创建训练工作空间
         training_dir = self._create_training_workspace(task)
@@ -126,49 +344,18 @@ class MusubiTrainer:
         except ValueError:
             raise TrainingError(f"无效的分辨率格式: {task.config.resolution}")
         
-        # 创建TOML配置 - 按照正确的格式顺序
-        dataset_config = {
-            "general": {
-                "resolution": [width, height],
-                "caption_extension": ".txt",
-                "batch_size": task.config.batch_size,
-                "enable_bucket": task.config.enable_bucket,
-                "bucket_no_upscale": False,
-                "bucket_reso_steps": 64,
-                "min_bucket_reso": 256,
-                "max_bucket_reso": 1536,
-            },
-            "datasets": [
-                {
-                    "image_directory": str(dataset_path).replace('\\', '/'),  # 使用正斜杠
-                    "cache_directory": str(cache_dir).replace('\\', '/'),     # 使用正斜杠
-                    "num_repeats": task.config.repeats,
-                }
-            ]
-        }
-        
         # 保存到训练目录（持久化）- 手动控制格式
         toml_path = training_dir / "dataset.toml"
         
         # 手动构建TOML内容，确保正确的格式顺序（只包含musubi支持的字段）
         # 计算相对于musubi工作目录的相对路径
-        musubi_path = self.get_musubi_path()
-        rel_dataset_path = os.path.relpath(dataset_path, musubi_path).replace(chr(92), chr(47))
-        rel_cache_path = os.path.relpath(cache_dir, musubi_path).replace(chr(92), chr(47))
+        rel_dataset_path = self._relpath_to_musubi(dataset_path)
+        rel_cache_path = self._relpath_to_musubi(cache_dir)
         
-        toml_content = f"""# TagTracker 生成的数据集配置文件
-[general]
-resolution = [{width}, {height}]
-caption_extension = ".txt"
-batch_size = {task.config.batch_size}
-enable_bucket = {str(task.config.enable_bucket).lower()}
-bucket_no_upscale = false
-
-[[datasets]]
-image_directory = "{rel_dataset_path}"
-cache_directory = "{rel_cache_path}"
-num_repeats = {task.config.repeats}
-"""
+        toml_content = _render_dataset_toml(
+            width, height, task.config.batch_size, task.config.enable_bucket,
+            rel_dataset_path, rel_cache_path, task.config.repeats
+        )
         
         with open(toml_path, 'w', encoding='utf-8') as f:
             f.write(toml_content)
@@ -185,20 +372,24 @@ num_repeats = {task.config.repeats}
     
     def _save_training_config(self, task: TrainingTask, training_dir: Path) -> None:
         """保存训练配置到JSON文件（用于记录）"""
-        # 手动构建可序列化的配置字典
+        # orjson可直接序列化数据类和枚举，无需先构建中间字典；标准库json仍需手动转换
+        config_data = task.config if orjson is not None else self._config_to_dict(task.config)
         config_dict = {
             "task_id": task.id,
             "name": task.config.name,
             "training_type": task.config.training_type.value,
             "dataset_id": task.config.dataset_id,
-            "config": self._config_to_dict(task.config),
+            "config": config_data,
             "created_at": time.strftime('%Y-%m-%d %H:%M:%S'),
-            "platform": platform.system()
+            "platform": _PLATFORM_NAME
         }
         
         config_path = training_dir / "training_config.json"
-        with open(config_path, 'w', encoding='utf-8') as f:
-            json.dump(config_dict, f, indent=2, ensure_ascii=False)
+        # 一次性序列化后单次写入，优先使用orjson
+        if orjson is not None:
+            config_path.write_bytes(orjson.dumps(config_dict, default=str, option=orjson.OPT_INDENT_2))
+        else:
+            config_path.write_text(json.dumps(config_dict, indent=2, ensure_ascii=False), encoding='utf-8')
         
         log_info(f"训练配置已保存: {config_path}")
     
@@ -229,9 +420,9 @@ num_repeats = {task.config.repeats}
                 "persistent_data_loader_workers": config.persistent_data_loader_workers,
                 "seed": config.seed,
                 # 模型特定配置
-                "qwen_config": asdict(config.qwen_config) if config.qwen_config else None,
-                "flux_config": asdict(config.flux_config) if config.flux_config else None,
-                "sd_config": asdict(config.sd_config) if config.sd_config else None,
+                "qwen_config": _shallow_asdict(config.qwen_config),
+                "flux_config": _shallow_asdict(config.flux_config),
+                "sd_config": _shallow_asdict(config.sd_config),
             }
             return result
         except Exception as e:
@@ -286,43 +477,40 @@ num_repeats = {task.config.repeats}
         output_dir.mkdir(parents=True, exist_ok=True)
         
         # 基础命令 - 获取正确的accelerate命令
-        accelerate_cmd = self._get_accelerate_cmd()
-        cmd = accelerate_cmd + [
+        # _get_accelerate_cmd 每次返回新列表，直接在其上追加，参数组使用元组避免临时列表
+        cmd = self._get_accelerate_cmd()
+        cmd += (
             "launch",
             "--num_cpu_threads_per_process", "1",
             "--mixed_precision", "bf16",
             script_path
-        ]
+        )
         
         # 模型路径参数
         cmd.extend(self._build_model_args(config))
         
         # 数据集配置 - 使用相对路径
         try:
-            config_path = Path(dataset_config_path).resolve()
-            musubi_path = Path(self.get_musubi_path()).resolve()
-            relative_config_path = os.path.relpath(config_path, musubi_path)
-            # 确保使用正确的路径分隔符
-            relative_config_path = relative_config_path.replace('\\', '/')
+            relative_config_path = self._relpath_to_musubi(dataset_config_path)
         except Exception:
             relative_config_path = dataset_config_path
-        cmd.extend(["--dataset_config", relative_config_path])
+        cmd += ("--dataset_config", relative_config_path)
         
         # 输出配置
-        cmd.extend([
+        cmd += (
             "--output_dir", str(output_dir),
             "--output_name", f"{config.name}_lora"
-        ])
+        )
         
         # 网络配置
-        cmd.extend([
+        cmd += (
             "--network_module", preset["network_module"],
             "--network_dim", str(config.network_dim),
             "--network_alpha", str(config.network_alpha)
-        ])
+        )
         
         # 训练参数
-        cmd.extend([
+        cmd += (
             "--max_train_epochs", str(config.epochs),
             "--learning_rate", str(config.learning_rate),
             "--optimizer_type", config.optimizer,
@@ -330,43 +518,28 @@ num_repeats = {task.config.repeats}
             "--save_every_n_epochs", str(config.save_every_n_epochs),
             "--seed", str(config.seed),
             "--max_data_loader_n_workers", str(config.max_data_loader_n_workers)
-        ])
+        )
         
-        # 预设默认参数
-        for key, value in preset["default_args"].items():
-            if value is None:  # flag参数
-                cmd.append(key)
-            else:
-                cmd.extend([key, str(value)])
+        # 预设默认参数（导入时已展开为命令行参数）
+        cmd += preset["cli_args"]
         
         # 模型特有参数
         if config.training_type == TrainingType.QWEN_IMAGE_LORA:
             qwen = config.qwen_config
             
-            # 可选参数
-            if qwen.gradient_checkpointing:
-                cmd.append("--gradient_checkpointing")
-            if qwen.fp8_base:
-                cmd.append("--fp8_base")
-            if qwen.fp8_scaled:
-                cmd.append("--fp8_scaled")
-            if qwen.fp8_vl:
-                cmd.append("--fp8_vl")
-            if qwen.blocks_to_swap > 0:
-                cmd.extend(["--blocks_to_swap", str(qwen.blocks_to_swap)])
-            if qwen.split_attn:
-                cmd.append("--split_attn")
-        
-        # 采样配置
+            # 可选参数（相同开关组合复用已生成的参数序列）
+            cmd.extend(_qwen_optional_args(
+                qwen.gradient_checkpointing, qwen.fp8_base, qwen.fp8_scaled,
+                qwen.fp8_vl, qwen.blocks_to_swap, qwen.split_attn
+            ))
+        
+        # 采样配置（提示词文件由_write_sample_prompts写出）
         if config.sample_prompt:
-            sample_prompts_file = training_dir / "sample_prompts.txt"
-            with open(sample_prompts_file, 'w', encoding='utf-8') as f:
-                f.write(config.sample_prompt)
-            cmd.extend([
-                "--sample_prompts", str(sample_prompts_file),
+            cmd += (
+                "--sample_prompts", str(training_dir / "sample_prompts.txt"),
                 "--sample_every_n_epochs", "1",
                 "--sample_at_first"
-            ])
+            )
         
         # 数据加载器
         if config.persistent_data_loader_workers:
@@ -374,23 +547,63 @@ num_repeats = {task.config.repeats}
         
         # 日志目录
         log_dir = training_dir / "logs"  
-        cmd.extend(["--logging_dir", str(log_dir)])
+        cmd += ("--logging_dir", str(log_dir))
         
-        log_info(f"训练命令: {' '.join(cmd)}")
         return cmd
     
-    def _create_training_scripts(self, task: TrainingTask, dataset_config_path: str, training_dir: Path) -> Dict[str, str]:
-        """创建训练脚本文件（bat和sh）"""
-        cmd = self._build_training_command(task, dataset_config_path, training_dir)
+    def _write_sample_prompts(self, task: TrainingTask, training_dir: Path) -> None:
+        """写出采样提示词文件（未设置采样提示词时跳过）"""
+        if task.config.sample_prompt:
+            with open(training_dir / "sample_prompts.txt", 'w', encoding='utf-8') as f:
+                f.write(task.config.sample_prompt)
+    
+    def _create_training_scripts(self, task: TrainingTask, cmd: List[str], training_dir: Path,
+                                 write_script: bool = True) -> Dict[str, Any]:
+        """记录训练命令，只写出当前平台的启动脚本（其他平台的脚本通过export_launch_script按需导出）"""
+        self._launch_commands[task.id] = cmd
         
-        # 获取musubi工作目录
-        musubi_dir = self.get_musubi_path()
+        target_os = 'windows' if _IS_WINDOWS else 'posix'
+        # 命令行只转义一次，日志和启动脚本共用
+        command_line = self._format_command(cmd, target_os)
+        log_info(f"训练命令: {command_line}")
+        if write_script:
+            script_path = self._write_launch_script(task, training_dir, cmd, target_os, command_line)
+        else:
+            script_path = training_dir / ("train.bat" if _IS_WINDOWS else "train.sh")
         
-        # 使用当前Python解释器执行训练命令
-        script_cmd = cmd
+        return {
+            'script': str(script_path),
+            'command': cmd
+        }
+    
+    def export_launch_script(self, task: TrainingTask, target_os: str) -> Path:
+        """导出指定平台（windows/posix）的训练启动脚本，供用户手动运行"""
+        cmd = self._launch_commands.get(task.id)
+        if cmd is None:
+            raise TrainingError(f"训练任务尚未准备，无法导出脚本: {task.id}")
+        training_dir = Path(self.config.storage.workspace_root) / "trainings" / task.id
+        return self._write_launch_script(task, training_dir, cmd, target_os)
+    
+    @staticmethod
+    def _format_command(cmd: List[str], target_os: str) -> str:
+        """按目标平台shell的规则转义命令行，避免路径中含引号等特殊字符时被错误拆分"""
+        if target_os == 'windows':
+            return subprocess.list2cmdline(cmd)
+        return shlex.join(cmd)
+    
+    def _write_launch_script(self, task: TrainingTask, training_dir: Path, cmd: List[str], target_os: str,
+                             command_line: Optional[str] = None) -> Path:
+        """写出指定平台的训练启动脚本，command_line为已按该平台转义的命令行"""
+        musubi_dir = self.get_musubi_path()
+        if command_line is None:
+            command_line = self._format_command(cmd, target_os)
+        log_file = training_dir / 'logs' / 'training.log'
         
-        # Windows批处理脚本
-        bat_content = f'''@echo off
+        if target_os == 'windows':
+            # Windows批处理脚本，切换到UTF-8代码页后直接以UTF-8保存
+            script_path = training_dir / "train.bat"
+            content = f'''@echo off
+chcp 65001 >nul
 echo ===== TagTracker Musubi 训练脚本 =====
 echo 任务名称: {task.config.name}
 echo Python解释器: {sys.executable}
@@ -401,16 +614,17 @@ cd /d "{musubi_dir}"
 set PYTHONPATH={musubi_dir}\\src;%PYTHONPATH%
 set PYTHONIOENCODING=utf-8
 
-{' '.join(f'"{arg}"' if ' ' in arg else arg for arg in script_cmd)} 2>&1 | tee "{training_dir / 'logs' / 'training.log'}"
+{command_line} 2>&1 | tee "{log_file}"
 
 echo =====================================
 echo 训练完成时间: %date% %time%
 echo =====================================
 pause
 '''
-        
-        # Linux/Mac shell脚本
-        sh_content = f'''#!/bin/bash
+        else:
+            # Linux/Mac shell脚本
+            script_path = training_dir / "train.sh"
+            content = f'''#!/bin/bash
 echo "===== TagTracker Musubi 训练脚本 ====="
 echo "任务名称: {task.config.name}"
 echo "Python解释器: {sys.executable}"
@@ -421,33 +635,22 @@ cd "{musubi_dir}"
 export PYTHONPATH="{musubi_dir}/src:$PYTHONPATH"
 export PYTHONIOENCODING=utf-8
 
-{' '.join(f'"{arg}"' if ' ' in arg else arg for arg in script_cmd)} 2>&1 | tee "{training_dir / 'logs' / 'training.log'}"
+{command_line} 2>&1 | tee "{log_file}"
 
 echo "====================================="
 echo "训练完成时间: $(date)"
 echo "====================================="
 '''
         
-        # 保存脚本文件
-        bat_path = training_dir / "train.bat"
-        sh_path = training_dir / "train.sh"
-        
-        with open(bat_path, 'w', encoding='gbk') as f:
-            f.write(bat_content)
-        
-        with open(sh_path, 'w', encoding='utf-8') as f:
-            f.write(sh_content)
+        with open(script_path, 'w', encoding='utf-8') as f:
+            f.write(content)
         
         # Linux/Mac脚本设置执行权限
-        if platform.system() != 'Windows':
-            os.chmod(sh_path, 0o755)
+        if target_os != 'windows' and not _IS_WINDOWS:
+            os.chmod(script_path, 0o755)
         
-        log_info(f"训练脚本已生成: {bat_path}, {sh_path}")
-        return {
-            'bat_script': str(bat_path),
-            'sh_script': str(sh_path),
-            'command': script_cmd
-        }
+        log_info(f"训练脚本已生成: {script_path}")
+        return script_path
     
     def _run_cache_steps(self, task: TrainingTask, dataset_config_path: str, log_callback: Optional[Callable[[str], None]] = None) -> bool:
         """执行预处理缓存步骤"""
@@ -465,7 +668,7 @@ echo "====================================="
         
         for script_name in cache_scripts:
             script_path = musubi_dir / script_name
-            if not script_path.exists():
+            if not _path_exists(script_path):
                 log_error(f"缓存脚本不存在: {script_path}")
                 return False
                 
@@ -474,13 +677,9 @@ echo "====================================="
             # 构建缓存命令 - 使用当前激活的Python解释器
             # 计算相对于musubi工作目录的相对路径
             try:
-                config_path = Path(dataset_config_path).resolve()
-                musubi_path = Path(musubi_dir).resolve()
-                relative_config_path = os.path.relpath(config_path, musubi_path)
-                # 确保使用正确的路径分隔符
-                relative_config_path = relative_config_path.replace('\\', '/')
-                log_info(f"TOML绝对路径: {config_path}")
-                log_info(f"Musubi工作目录: {musubi_path}")
+                relative_config_path = self._relpath_to_musubi(dataset_config_path)
+                log_info(f"TOML路径: {dataset_config_path}")
+                log_info(f"Musubi工作目录: {self._musubi_resolved}")
                 log_info(f"使用相对路径: {relative_config_path}")
             except Exception as e:
                 log_error(f"路径转换失败，使用绝对路径: {e}")
@@ -514,35 +713,40 @@ echo "====================================="
                     env=env,
                     stdout=subprocess.PIPE,
                     stderr=subprocess.STDOUT,
-                    text=True,
-                    encoding='utf-8',
-                    errors='replace',
-                    bufsize=1,
-                    universal_newlines=True
+                    bufsize=0  # 二进制无缓冲管道，由读取线程按块读取并切分行
                 )
                 
-                # 实时读取输出，带超时控制
-                import time
-                start_time = time.time()
-                timeout_seconds = 1800  # 30分钟超时
+                # 独立线程读取输出，循环定时醒来检查超时，不会阻塞在读取上
+                lines: Queue = Queue(maxsize=_OUTPUT_QUEUE_SIZE)
+                stop = threading.Event()
+                threading.Thread(target=self._read_output, args=(cache_proc.stdout, lines, None, stop), daemon=True).start()
+                deadline = time.monotonic() + _CACHE_STEP_TIMEOUT
                 
-                while True:
-                    output = cache_proc.stdout.readline()
-                    if output == '' and cache_proc.poll() is not None:
-                        break
-                    if output:
-                        line = output.strip()
-                        log_info(f"[缓存] {line}")
-                        if log_callback:
-                            log_callback(f"[缓存] {line}")
-                    
-                    # 检查超时
-                    if time.time() - start_time > timeout_seconds:
-                        cache_proc.terminate()
-                        raise subprocess.TimeoutExpired(cache_cmd, timeout_seconds)
+                try:
+                    while True:
+                        try:
+                            output = lines.get(timeout=_PROGRESS_CALLBACK_INTERVAL)
+                        except Empty:
+                            output = ''
+                        if output is None:
+                            break
+                        if output:
+                            # 日志行只格式化一次，供日志系统和回调共用
+                            message = f"[缓存] {output.strip()}"
+                            log_info(message)
+                            if log_callback:
+                                log_callback(message)
+                        
+                        # 检查超时
+                        if time.monotonic() > deadline:
+                            cache_proc.terminate()
+                            raise subprocess.TimeoutExpired(cache_cmd, _CACHE_STEP_TIMEOUT)
+                finally:
+                    # 超时或异常退出时通知读取线程结束，避免其阻塞在已无人消费的队列上
+                    stop.set()
                 
                 # 检查返回码
-                return_code = cache_proc.poll()
+                return_code = cache_proc.wait()
                 if return_code != 0:
                     error_msg = f"预处理失败，退出码: {return_code}"
                     log_error(error_msg)
@@ -573,20 +777,35 @@ echo "====================================="
     def prepare_training(self, task: TrainingTask) -> Dict[str, Any]:
         """准备训练环境和文件"""
         try:
-            # 验证配置
+            # 验证配置；数据集目录每次都检查，复用已生成的文件时也不能跳过
             self._validate_config(task.config)
-            
-            # 创建数据集配置
-            dataset_config_path = self._create_dataset_config(task)
+            self._dataset_path(task)
             
             # 获取训练目录
             training_dir = self._create_training_workspace(task)
             
-            # 保存训练配置记录
-            self._save_training_config(task, training_dir)
+            # 训练命令不写文件，先构建出来参与摘要计算
+            dataset_config_path = str(training_dir / "dataset.toml")
+            cmd = self._build_training_command(task, dataset_config_path, training_dir)
             
-            # 生成训练脚本
-            scripts_info = self._create_training_scripts(task, dataset_config_path, training_dir)
+            # 输入未变化且文件仍在时复用上次生成的全部训练文件，不做任何写入
+            digest = self._prepare_digest(task, cmd)
+            digest_path = training_dir / ".prepare.hash"
+            if self._prepared_files_current(task, digest_path, digest, dataset_config_path):
+                log_info("训练输入未变化，复用已生成的训练文件")
+                scripts_info = self._create_training_scripts(task, cmd, training_dir, write_script=False)
+            else:
+                # 创建数据集配置
+                dataset_config_path = self._create_dataset_config(task)
+                
+                # 保存训练配置记录和采样提示词
+                self._save_training_config(task, training_dir)
+                self._write_sample_prompts(task, training_dir)
+                
+                # 生成训练脚本
+                scripts_info = self._create_training_scripts(task, cmd, training_dir)
+                
+                digest_path.write_text(digest, encoding='utf-8')
             
             return {
                 'training_dir': training_dir,
@@ -599,6 +818,39 @@ echo "====================================="
             log_error(f"准备训练失败: {e}")
             raise TrainingError(f"准备训练失败: {e}")
     
+    def _prepare_digest(self, task: TrainingTask, cmd: List[str]) -> str:
+        """
+        训练准备输入的摘要，用于判断生成的文件是否需要更新
+        
+        覆盖所有写入生成文件的内容：配置（数据集配置、配置记录和采样提示词）、
+        完整的训练命令（预设参数、模型路径、输出目录等）以及启动脚本中的路径和解释器
+        """
+        key = {
+            'task_id': task.id,
+            'config': self._config_to_dict(task.config),
+            'command': cmd,
+            'workspace_root': str(Path(self.config.storage.workspace_root).resolve()),
+            'musubi_dir': str(self._musubi_resolved),
+            'python': sys.executable,
+            'platform': _PLATFORM_NAME,
+        }
+        raw = json.dumps(key, sort_keys=True, ensure_ascii=False).encode('utf-8')
+        return hashlib.blake2b(raw, digest_size=16).hexdigest()
+    
+    def _prepared_files_current(self, task: TrainingTask, digest_path: Path, digest: str,
+                                dataset_config_path: str) -> bool:
+        """已保存的摘要与当前输入一致，且数据集配置、启动脚本和采样提示词文件都还存在"""
+        try:
+            if digest_path.read_text(encoding='utf-8') != digest:
+                return False
+        except OSError:
+            return False
+        training_dir = digest_path.parent
+        script_path = training_dir / ("train.bat" if _IS_WINDOWS else "train.sh")
+        if task.config.sample_prompt and not os.path.isfile(training_dir / "sample_prompts.txt"):
+            return False
+        return os.path.isfile(dataset_config_path) and os.path.isfile(script_path)
+    
     def _validate_config(self, config: TrainingConfig):
         """验证训练配置"""
         if config.training_type not in TRAINING_PRESETS:
@@ -610,11 +862,11 @@ echo "====================================="
         # 验证模型路径
         if config.training_type == TrainingType.QWEN_IMAGE_LORA:
             qwen = config.qwen_config
-            if not qwen.dit_path or not os.path.exists(qwen.dit_path):
+            if not _path_exists(qwen.dit_path):
                 raise TrainingError("DiT模型路径无效")
-            if not qwen.vae_path or not os.path.exists(qwen.vae_path):
+            if not _path_exists(qwen.vae_path):
                 raise TrainingError("VAE模型路径无效")
-            if not qwen.text_encoder_path or not os.path.exists(qwen.text_encoder_path):
+            if not _path_exists(qwen.text_encoder_path):
                 raise TrainingError("Text Encoder路径无效")
     
     def run_training(self, 
@@ -661,7 +913,7 @@ echo "====================================="
             env['PYTHONIOENCODING'] = 'utf-8'
             
             # 创建进程，确保能够管理整个进程树
-            if os.name == 'nt':  # Windows
+            if _IS_WINDOWS:  # Windows
                 # Windows上使用CREATE_NEW_PROCESS_GROUP
                 self._proc = subprocess.Popen(
                     cmd,
@@ -669,11 +921,7 @@ echo "====================================="
                     env=env,
                     stdout=subprocess.PIPE,
                     stderr=subprocess.STDOUT,
-                    text=True,
-                    encoding='utf-8',
-                    errors='replace',
-                    bufsize=1,
-                    universal_newlines=True,
+                    bufsize=0,  # 二进制无缓冲管道，由读取线程按块读取并切分行
                     creationflags=subprocess.CREATE_NEW_PROCESS_GROUP
                 )
             else:  # Unix/Linux
@@ -684,16 +932,12 @@ echo "====================================="
                     env=env,
                     stdout=subprocess.PIPE,
                     stderr=subprocess.STDOUT,
-                    text=True,
-                    encoding='utf-8',
-                    errors='replace',
-                    bufsize=1,
-                    universal_newlines=True,
-                    preexec_fn=os.setsid  # 创建新会话，便于管理进程组
+                    bufsize=0,  # 二进制无缓冲管道，由读取线程按块读取并切分行
+                    start_new_session=True  # 创建新会话（独立进程组），取消时可整组终止
                 )
 
-            # 实时读取输出并监控进度
-            return self._monitor_training(task, progress_callback, log_callback)
+            # 实时读取输出并监控进度，输出同时写入训练日志文件（替代脚本中的tee）
+            return self._monitor_training(task, progress_callback, log_callback, training_info['log_file'])
 
         except Exception as e:
             task.state = TrainingState.FAILED
@@ -709,49 +953,77 @@ echo "====================================="
     def _monitor_training(self,
                           task: TrainingTask,
                           progress_callback: Optional[Callable[[Dict[str, Any]], None]] = None,
-                          log_callback: Optional[Callable[[str], None]] = None) -> bool:
-        """监控训练进度"""
+                          log_callback: Optional[Callable[[str], None]] = None,
+                          log_file: Optional[Path] = None) -> bool:
+        """监控训练进度，取消训练后由这里等待进程退出并在超时后强制终止"""
+        proc = self._proc
+        if not proc:
+            return False
+        # 监控结束时通知读取线程退出，读取线程不会阻塞在已无人消费的队列上
+        stop = threading.Event()
         try:
-            if not self._proc:
-                return False
+            # 独立线程读取输出放入有界队列，监控循环可以定时醒来处理节流和取消
+            lines: Queue = Queue(maxsize=_OUTPUT_QUEUE_SIZE)
+            reader = threading.Thread(target=self._read_output, args=(proc.stdout, lines, log_file, stop), daemon=True)
+            reader.start()
+
+            self._reported_eta = None
+            killed = False
+
+            # 进度回调节流：最多每隔一段时间回调一次，最后一步和输出暂停时会补发最新进度
+            last_callback = 0.0
+            last_payload: Optional[Dict[str, Any]] = None
+            pending = False
 
             while True:
-                output = self._proc.stdout.readline()
-                if output == '' and self._proc.poll() is not None:
+                try:
+                    output = lines.get(timeout=_PROGRESS_CALLBACK_INTERVAL)
+                except Empty:
+                    output = ''
+                    # 每个超时周期只检查一次进程状态；进程已退出后给读取线程一个周期读到EOF，
+                    # 仍未结束说明管道被子进程继承占用，不再等待
+                    if proc.poll() is not None:
+                        reader.join(_PROGRESS_CALLBACK_INTERVAL)
+                        if reader.is_alive() and lines.empty():
+                            break
+                if output is None:
                     break
 
-                if output:
-                    line = output.strip()
-                    if log_callback:
-                        log_callback(line)
-
-                    # 解析训练进度
-                    progress_info = self._parse_training_output(line)
-                    if progress_info:
-                        # 更新任务状态
-                        for key, value in progress_info.items():
-                            if hasattr(task, key):
-                                setattr(task, key, value)
-
-                        # 计算进度百分比
-                        if task.total_steps > 0:
-                            task.progress = task.current_step / task.total_steps
-
-                        # 回调更新
-                        if progress_callback:
-                            progress_callback({
-                                "step": task.current_step,
-                                "total_steps": task.total_steps,
-                                "epoch": task.current_epoch,
-                                "loss": task.loss,
-                                "lr": task.learning_rate,
-                                "speed": task.speed,
-                                "eta_seconds": task.eta_seconds,
-                                "progress": task.progress
-                            })
+                # 已取消但进程未在期限内退出（忽略了终止信号），强制终止整个进程组
+                if (self._cancel_deadline is not None and not killed
+                        and time.monotonic() >= self._cancel_deadline):
+                    log_info("训练进程未在超时内退出，强制终止")
+                    self._signal_process_tree(proc, force=True)
+                    killed = True
+
+                if output and self._handle_output_line(task, output.strip(), log_callback):
+                    pending = True
+
+                if pending and progress_callback:
+                    now = time.monotonic()
+                    if (now - last_callback >= _PROGRESS_CALLBACK_INTERVAL
+                            or task.current_step == task.total_steps):
+                        last_callback = now
+                        pending = False
+                        # 只有进度字段实际变化时才回调
+                        payload = self._progress_payload(task)
+                        if payload != last_payload:
+                            last_payload = payload
+                            progress_callback(payload)
+
+            if pending and progress_callback:
+                payload = self._progress_payload(task)
+                if payload != last_payload:
+                    progress_callback(payload)
 
             # 检查训练结果
-            return_code = self._proc.poll()
+            return_code = proc.wait()
+            if self._cancel_deadline is not None:
+                # 主进程退出后组内仍可能残留子进程，统一强制终止
+                self._signal_process_tree(proc, force=True)
+                task.state = TrainingState.CANCELLED
+                log_info(f"训练已取消: {task.config.name}")
+                return False
             if return_code == 0:
                 task.state = TrainingState.COMPLETED
                 log_success(f"训练完成: {task.config.name}")
@@ -780,43 +1052,140 @@ echo "====================================="
                     "error": task.error_message
                 })
             return False
+        finally:
+            stop.set()
+            self._proc = None
+            self._cancel_deadline = None
+
+    def _read_output(self,
+                     stream,
+                     lines: Queue,
+                     log_file: Optional[Path] = None,
+                     stop: Optional[threading.Event] = None) -> None:
+        """按块读取进程输出，切分为行后放入队列，结束时放入None；指定log_file时原样追加写入
+
+        指定stop时，停止标志置位后不再读取，队列满时也不会一直阻塞，线程随即退出并关闭日志文件
+        """
+        # 以二进制读取而不是文本模式：原始字节可直接写入log_file，无需解码后再编码；
+        # 每行仍要解码交给日志回调，\r按换行处理，与原先文本模式的行为一致
+        fd = stream.fileno()
+        pending = b''
+        log_fh = None
+        if log_file is not None:
+            try:
+                # 不缓冲：每个读取块直接写入文件，训练进行中也能查看完整日志
+                log_fh = open(log_file, 'ab', buffering=0)
+            except OSError as e:
+                log_error(f"打开训练日志文件失败: {e}")
+        try:
+            while stop is None or not stop.is_set():
+                if stop is not None and not _IS_WINDOWS:
+                    # 定时醒来检查停止标志，子进程继承管道不退出时也不会一直阻塞在读取上
+                    ready, _, _ = select.select([fd], [], [], _PROGRESS_CALLBACK_INTERVAL)
+                    if not ready:
+                        continue
+                chunk = os.read(fd, _PIPE_BUFSIZE)
+                if not chunk:
+                    if pending:
+                        _put_output(lines, pending.decode('utf-8', 'replace'), stop)
+                    break
+                if log_fh is not None:
+                    log_fh.write(chunk)
+                # 进度条用\r刷新同一行，与文本模式一样当作换行处理
+                *complete, pending = (pending + chunk.replace(b'\r', b'\n')).split(b'\n')
+                for raw in complete:
+                    if raw and not _put_output(lines, raw.decode('utf-8', 'replace'), stop):
+                        return
+        except (OSError, ValueError):
+            # 进程被终止后管道可能已关闭
+            pass
+        finally:
+            if log_fh is not None:
+                log_fh.close()
+            _put_output(lines, None, stop)
+
+    def _handle_output_line(self,
+                            task: TrainingTask,
+                            line: str,
+                            log_callback: Optional[Callable[[str], None]] = None) -> bool:
+        """处理一行训练输出，解析到进度信息时返回True"""
+        if not line:
+            return False
+        if log_callback:
+            log_callback(line)
+
+        # 解析训练进度
+        progress_info = self._parse_training_output(line)
+        if not progress_info:
+            return False
+
+        # 更新任务状态（只更新本行解析到的字段）
+        if 'current_step' in progress_info:
+            task.current_step = progress_info['current_step']
+            task.total_steps = progress_info['total_steps']
+        if 'current_epoch' in progress_info:
+            task.current_epoch = progress_info['current_epoch']
+        if 'loss' in progress_info:
+            task.loss = progress_info['loss']
+        if 'learning_rate' in progress_info:
+            task.learning_rate = progress_info['learning_rate']
+        if 'speed' in progress_info:
+            task.speed = progress_info['speed']
+        if 'eta_seconds' in progress_info:
+            task.eta_seconds = self._reported_eta = progress_info['eta_seconds']
+
+        # 计算进度百分比
+        if task.total_steps > 0:
+            task.progress = task.current_step / task.total_steps
+        return True
+
+    def _progress_payload(self, task: TrainingTask) -> Dict[str, Any]:
+        """构建进度回调数据"""
+        return {
+            "step": task.current_step,
+            "total_steps": task.total_steps,
+            "epoch": task.current_epoch,
+            "loss": task.loss,
+            "lr": task.learning_rate,
+            "speed": task.speed,
+            "eta_seconds": self._reported_eta,
+            "progress": task.progress
+        }
 
     def _parse_training_output(self, line: str) -> Optional[Dict[str, Any]]:
         """解析训练输出，提取进度信息"""
         try:
+            # 先做一次关键字扫描，大部分不含进度信息的行无需执行完整解析
+            if not _RE_PROGRESS_HINT.search(line):
+                return None
+
             progress_info = {}
 
-            # 解析步数和轮次
-            epoch_match = re.search(r'Epoch (\d+)/(\d+)', line)
-            if epoch_match:
-                progress_info['current_epoch'] = int(epoch_match.group(1))
-                progress_info['total_epochs'] = int(epoch_match.group(2))
-
-            step_match = re.search(r'Step (\d+)/(\d+)', line)
-            if step_match:
-                progress_info['current_step'] = int(step_match.group(1))
-                progress_info['total_steps'] = int(step_match.group(2))
-
-            # 解析loss
-            loss_match = re.search(r'loss:?\s*([\d.]+)', line, re.IGNORECASE)
-            if loss_match:
-                progress_info['loss'] = float(loss_match.group(1))
-
-            # 解析学习率
-            lr_match = re.search(r'lr:?\s*([\d.e-]+)', line, re.IGNORECASE)
-            if lr_match:
-                progress_info['learning_rate'] = float(lr_match.group(1))
-
-            # 解析速度
-            speed_match = re.search(r'([\d.]+)\s*it/s', line)
-            if speed_match:
-                progress_info['speed'] = float(speed_match.group(1))
-
-            # 解析ETA
-            eta_match = re.search(r'ETA:?\s*(\d{2}):(\d{2}):(\d{2})', line)
-            if eta_match:
-                hours, minutes, seconds = map(int, eta_match.groups())
-                progress_info['eta_seconds'] = hours * 3600 + minutes * 60 + seconds
+            # 一次扫描提取所有字段，同一字段只取第一次出现的值
+            for match in _RE_PROGRESS.finditer(line):
+                kind = match.lastgroup
+                if kind == 'total_epochs':
+                    # 解析轮次
+                    if 'current_epoch' not in progress_info:
+                        progress_info['current_epoch'] = int(match.group('epoch'))
+                        progress_info['total_epochs'] = int(match.group('total_epochs'))
+                elif kind == 'total_steps':
+                    # 解析步数
+                    if 'current_step' not in progress_info:
+                        progress_info['current_step'] = int(match.group('step'))
+                        progress_info['total_steps'] = int(match.group('total_steps'))
+                elif kind == 'loss':
+                    progress_info.setdefault('loss', float(match.group('loss')))
+                elif kind == 'lr':
+                    # 解析学习率
+                    progress_info.setdefault('learning_rate', float(match.group('lr')))
+                elif kind == 'speed':
+                    # 解析速度
+                    progress_info.setdefault('speed', float(match.group('speed')))
+                elif kind == 'eta_s':
+                    # 解析ETA
+                    hours, minutes, seconds = map(int, match.group('eta_h', 'eta_m', 'eta_s'))
+                    progress_info.setdefault('eta_seconds', hours * 3600 + minutes * 60 + seconds)
 
             return progress_info if progress_info else None
 
@@ -825,141 +1194,71 @@ echo "====================================="
             return None
 
     def cancel_training(self):
-        """取消训练 - 强制终止所有相关进程"""
-        if self._proc and self._proc.poll() is None:
-            try:
-                log_info("正在取消训练...")
-                
-                # 获取主进程PID
-                main_pid = self._proc.pid
-                log_info(f"主训练进程PID: {main_pid}")
-                
-                # 方法1: 尝试优雅终止进程树
-                try:
-                    parent = psutil.Process(main_pid)
-                    children = parent.children(recursive=True)
-                    
-                    log_info(f"发现 {len(children)} 个子进程")
-                    
-                    # 首先尝试优雅终止所有子进程
-                    for child in children:
-                        try:
-                            log_info(f"终止子进程: PID={child.pid}, 名称={child.name()}")
-                            child.terminate()
-                        except (psutil.NoSuchProcess, psutil.AccessDenied):
-                            pass
-                    
-                    # 终止主进程
-                    parent.terminate()
-                    
-                    # 等待进程结束
-                    gone, alive = psutil.wait_procs(children + [parent], timeout=10)
-                    
-                    # 强制杀死仍然存活的进程
-                    if alive:
-                        log_info(f"强制杀死 {len(alive)} 个未响应的进程")
-                        for proc in alive:
-                            try:
-                                log_info(f"强制杀死进程: PID={proc.pid}, 名称={proc.name()}")
-                                proc.kill()
-                            except (psutil.NoSuchProcess, psutil.AccessDenied):
-                                pass
-                        
-                        # 再次等待
-                        psutil.wait_procs(alive, timeout=5)
-                    
-                except psutil.NoSuchProcess:
-                    log_info("主进程已不存在")
-                except Exception as e:
-                    log_error(f"使用psutil终止进程失败: {e}")
-                    
-                    # 方法2: 回退到原始的进程终止方法
-                    log_info("回退到基础进程终止方法")
-                    try:
-                        if os.name == 'nt':  # Windows
-                            # Windows上强制终止进程树
-                            subprocess.run([
-                                "taskkill", "/F", "/T", "/PID", str(main_pid)
-                            ], capture_output=True, check=False)
-                        else:  # Unix/Linux
-                            # 发送SIGTERM到进程组
-                            os.killpg(os.getpgid(main_pid), signal.SIGTERM)
-                            time.sleep(2)
-                            # 如果还未结束，发送SIGKILL
-                            try:
-                                os.killpg(os.getpgid(main_pid), signal.SIGKILL)
-                            except ProcessLookupError:
-                                pass
-                    except Exception as e2:
-                        log_error(f"回退方法也失败: {e2}")
-                
-                # 方法3: 额外安全检查 - 查找可能的训练相关进程
-                try:
-                    self._cleanup_training_processes()
-                except Exception as e:
-                    log_error(f"清理训练进程时出错: {e}")
-                
-                log_info("训练取消完成")
-                
-            except Exception as e:
-                log_error(f"取消训练时出错: {e}")
-            finally:
-                self._proc = None
-    
-    def _cleanup_training_processes(self):
-        """清理可能残留的训练相关进程"""
+        """取消训练：向训练进程组发送终止信号后立即返回，进程退出和超时强制终止由监控循环处理"""
+        proc = self._proc
+        if not proc or proc.poll() is not None:
+            return
         try:
-            # 查找可能的训练进程（基于进程名称和命令行）
-            training_keywords = [
-                "qwen_image_train_network.py",
-                "musubi_tuner",
-                "accelerate",
-                "torch.distributed.run"
-            ]
-            
-            killed_count = 0
-            for proc in psutil.process_iter(['pid', 'name', 'cmdline']):
-                try:
-                    cmdline = ' '.join(proc.info['cmdline'] or [])
-                    
-                    # 检查是否为训练相关进程
-                    is_training_proc = any(keyword in cmdline.lower() for keyword in training_keywords)
-                    
-                    if is_training_proc:
-                        # 额外检查确保不是当前Python解释器进程
-                        if proc.pid != os.getpid():
-                            log_info(f"发现可能的残留训练进程: PID={proc.pid}, 命令={cmdline[:100]}...")
-                            proc.kill()
-                            killed_count += 1
-                            
-                except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
-                    pass
-            
-            if killed_count > 0:
-                log_info(f"清理了 {killed_count} 个残留的训练进程")
-                
+            log_info(f"正在取消训练，主训练进程PID: {proc.pid}")
+            self._cancel_deadline = time.monotonic() + _CANCEL_KILL_TIMEOUT
+            self._signal_process_tree(proc, force=False)
         except Exception as e:
-            log_error(f"清理进程时出错: {e}")
-    
+            log_error(f"取消训练时出错: {e}")
+
+    def _signal_process_tree(self, proc: subprocess.Popen, force: bool) -> None:
+        """向训练进程及其子进程发送终止信号，不等待退出；force时强制终止"""
+        if not _IS_WINDOWS:
+            # 训练进程以start_new_session启动，是独立进程组的组长，进程组号即其PID；
+            # 直接向整个进程组发信号，accelerate派生的GPU worker即使已脱离父进程也会一并终止
+            try:
+                os.killpg(proc.pid, signal.SIGKILL if force else signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+            return
+
+        if force:
+            # Windows上强制终止整个进程树
+            subprocess.run(["taskkill", "/F", "/T", "/PID", str(proc.pid)],
+                           capture_output=True, check=False)
+        else:
+            # 训练进程以CREATE_NEW_PROCESS_GROUP启动，可向整个进程组发送CTRL_BREAK
+            try:
+                proc.send_signal(signal.CTRL_BREAK_EVENT)
+            except OSError:
+                pass
+
     def _emergency_cleanup(self):
         """程序退出时的紧急清理"""
         try:
-            if self._proc and self._proc.poll() is None:
+            proc = self._proc
+            if proc and proc.poll() is None:
                 log_info("程序退出时发现正在运行的训练，执行紧急清理")
-                self.cancel_training()
+                # 程序即将退出，监控循环不一定还能运行，这里同步等待，超时后强制终止
+                self._signal_process_tree(proc, force=False)
+                if not _wait_process_exit(proc, 2.0):
+                    self._signal_process_tree(proc, force=True)
         except Exception as e:
             # 静默处理，避免程序退出时出现错误
             pass
 
     def is_available(self) -> bool:
-        """检查Musubi-Tuner是否可用"""
+        """检查Musubi-Tuner是否可用，结果缓存一段时间，避免界面频繁调用时重复检查文件"""
+        now = time.monotonic()
+        cached = self._available_cache
+        if cached is not None and now - cached[0] < _AVAILABLE_CACHE_TTL:
+            return cached[1]
+        available = self._check_available()
+        self._available_cache = (now, available)
+        return available
+
+    def _check_available(self) -> bool:
+        """实际检查Musubi-Tuner及训练脚本是否存在"""
         try:
-            musubi_dir = self.get_musubi_path()
+            musubi_dir = str(self.get_musubi_path())
             
-            # 检查关键脚本是否存在
-            for training_type in TRAINING_PRESETS:
-                script_path = musubi_dir / TRAINING_PRESETS[training_type]["script_path"]
-                if not script_path.exists():
+            # 检查关键脚本是否存在（直接用字符串路径检查，不构造Path对象）
+            for preset in TRAINING_PRESETS.values():
+                if not os.path.isfile(os.path.join(musubi_dir, preset["script_path"])):
                     return False
             
             return True
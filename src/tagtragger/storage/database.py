@@ -4,6 +4,7 @@ Database manager - SQLite数据库管理器
 
 import sqlite3
 import json
+import threading
 from pathlib import Path
 from typing import List, Dict, Any, Optional, Tuple
 from contextlib import contextmanager
@@ -20,13 +21,33 @@ class Database:
         self.db_path = Path(self.config.storage.workspace_root) / "data.db"
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
         
+        # 长期持有的连接，避免每次操作都重新打开数据库和解析表结构；多线程共享，由锁串行化
+        self._conn = self._open_connection()
+        self._lock = threading.RLock()
+        
         # 初始化数据库
         self._init_database()
     
+    def _open_connection(self) -> sqlite3.Connection:
+        """打开数据库连接并设置PRAGMA（WAL模式下读取不会阻塞写入）"""
+        try:
+            # 自动提交模式：事务边界只由transaction()中显式的BEGIN IMMEDIATE/COMMIT决定
+            conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+            conn.row_factory = sqlite3.Row  # 启用字典式访问
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('PRAGMA temp_store=MEMORY')
+            conn.execute('PRAGMA mmap_size=268435456')
+            conn.execute('PRAGMA cache_size=-20000')
+            return conn
+        except Exception as e:
+            log_error(f"打开数据库失败: {str(e)}")
+            raise StorageError(f"打开数据库失败: {str(e)}")
+    
     def _init_database(self):
         """初始化数据库表结构"""
         try:
-            with self.get_connection() as conn:
+            with self.transaction() as conn:
                 # 数据集表
                 conn.execute('''
                     CREATE TABLE IF NOT EXISTS datasets (
@@ -82,8 +103,6 @@ class Database:
                 conn.execute('CREATE INDEX IF NOT EXISTS idx_training_tasks_dataset_id ON training_tasks (dataset_id)')
                 conn.execute('CREATE INDEX IF NOT EXISTS idx_training_tasks_state ON training_tasks (state)')
                 
-                conn.commit()
-                
             log_info("数据库初始化完成")
             
         except Exception as e:
@@ -92,26 +111,39 @@ class Database:
     
     @contextmanager
     def get_connection(self):
-        """获取数据库连接的上下文管理器"""
-        conn = None
-        try:
-            conn = sqlite3.connect(self.db_path)
-            conn.row_factory = sqlite3.Row  # 启用字典式访问
-            yield conn
-        except Exception as e:
-            if conn:
-                conn.rollback()
-            raise StorageError(f"数据库连接错误: {str(e)}")
-        finally:
-            if conn:
-                conn.close()
+        """获取数据库连接的上下文管理器（复用长期连接，使用期间持有锁），用于只读查询"""
+        with self._lock:
+            try:
+                yield self._conn
+            except Exception as e:
+                raise StorageError(f"数据库连接错误: {str(e)}")
+    
+    @contextmanager
+    def transaction(self):
+        """写事务的上下文管理器：BEGIN IMMEDIATE开始，正常结束时COMMIT，出错时ROLLBACK"""
+        with self._lock:
+            conn = self._conn
+            try:
+                # IMMEDIATE在开始时即获取写锁，避免事务中途升级锁失败
+                conn.execute('BEGIN IMMEDIATE')
+                yield conn
+                conn.execute('COMMIT')
+            except Exception as e:
+                if conn.in_transaction:
+                    conn.execute('ROLLBACK')
+                raise StorageError(f"数据库事务失败: {str(e)}")
+    
+    def close(self) -> None:
+        """关闭数据库连接"""
+        with self._lock:
+            self._conn.close()
     
     # === 数据集相关操作 ===
     
     def save_dataset(self, dataset_dict: Dict[str, Any]) -> bool:
         """保存数据集信息"""
         try:
-            with self.get_connection() as conn:
+            with self.transaction() as conn:
                 conn.execute('''
                     INSERT OR REPLACE INTO datasets (
                         dataset_id, name, dataset_type, description, created_time, 
@@ -128,7 +160,6 @@ class Database:
                     len([l for l in dataset_dict.get('images', {}).values() if l.strip()]),
                     json.dumps(dataset_dict.get('tags', []))
                 ))
-                conn.commit()
                 return True
                 
         except Exception as e:
@@ -181,10 +212,9 @@ class Database:
     def delete_dataset(self, dataset_id: str) -> bool:
         """删除数据集"""
         try:
-            with self.get_connection() as conn:
+            with self.transaction() as conn:
                 conn.execute('DELETE FROM datasets WHERE dataset_id = ?', (dataset_id,))
                 conn.execute('DELETE FROM training_tasks WHERE dataset_id = ?', (dataset_id,))
-                conn.commit()
                 return True
                 
         except Exception as e:
@@ -196,7 +226,7 @@ class Database:
     def save_training_task(self, task_dict: Dict[str, Any]) -> bool:
         """保存训练任务"""
         try:
-            with self.get_connection() as conn:
+            with self.transaction() as conn:
                 conn.execute('''
                     INSERT OR REPLACE INTO training_tasks (
                         task_id, name, training_type, dataset_id, config_json,
@@ -225,7 +255,6 @@ class Database:
                     task_dict.get('error_message', ''),
                     task_dict.get('output_dir', '')
                 ))
-                conn.commit()
                 return True
                 
         except Exception as e:
@@ -290,9 +319,8 @@ class Database:
     def delete_training_task(self, task_id: str) -> bool:
         """删除训练任务"""
         try:
-            with self.get_connection() as conn:
+            with self.transaction() as conn:
                 conn.execute('DELETE FROM training_tasks WHERE task_id = ?', (task_id,))
-                conn.commit()
                 return True
                 
         except Exception as e:
@@ -305,12 +333,11 @@ class Database:
         """保存设置"""
         try:
             from datetime import datetime
-            with self.get_connection() as conn:
+            with self.transaction() as conn:
                 conn.execute('''
                     INSERT OR REPLACE INTO settings (key, value, updated_time)
                     VALUES (?, ?, ?)
                 ''', (key, json.dumps(value), datetime.now().isoformat()))
-                conn.commit()
                 return True
                 
         except Exception as e:
@@ -359,8 +386,8 @@ class Database:
         """优化数据库"""
         try:
             with self.get_connection() as conn:
+                # VACUUM不能在事务中执行，直接在自动提交模式下运行
                 conn.execute('VACUUM')
-                conn.commit()
                 log_info("数据库优化完成")
                 return True
                 
@@ -195,6 +195,7 @@ class TrainingListView:
         # 获取任务状态文本
         state_text = {
             TrainingState.PENDING: "待开始",
+            TrainingState.QUEUED: "排队中",
             TrainingState.PREPARING: "准备中",
             TrainingState.RUNNING: "训练中",
             TrainingState.COMPLETED: "已完成",
@@ -484,7 +485,7 @@ class TrainingDetailView:
         if task.state == TrainingState.PENDING:
             self.start_button.visible = True
             self.stop_button.visible = False
-        elif task.state in [TrainingState.PREPARING, TrainingState.RUNNING]:
+        elif task.state in [TrainingState.QUEUED, TrainingState.PREPARING, TrainingState.RUNNING]:
             self.start_button.visible = False
             self.stop_button.visible = True
         else:  # COMPLETED, FAILED, CANCELLED
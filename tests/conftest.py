@@ -0,0 +1,14 @@
+"""
+测试公共夹具
+"""
+
+import pytest
+
+from tagtragger.config import get_config
+
+
+@pytest.fixture
+def workspace(tmp_path, monkeypatch):
+    """将工作空间指向临时目录，避免测试读写真实的任务和缓存"""
+    monkeypatch.setattr(get_config().storage, 'workspace_root', str(tmp_path))
+    return tmp_path
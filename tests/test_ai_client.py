@@ -0,0 +1,119 @@
+"""
+AI客户端响应缓存测试
+"""
+
+import asyncio
+import sys
+
+import pytest
+
+from tagtragger.config import get_config
+from tagtragger.core.labeling import ai_client
+from tagtragger.core.labeling.ai_client import AIClient, ModelType
+from tagtragger.utils.exceptions import AIServiceError
+
+
+@pytest.fixture
+def client(workspace, monkeypatch):
+    client = AIClient()
+    calls = []
+
+    def fake_call(messages, **kwargs):
+        calls.append(messages)
+        return f"result {len(calls)}"
+
+    monkeypatch.setattr(client, '_call_gpt', fake_call)
+    client.calls = calls
+    return client
+
+
+@pytest.fixture
+def image(tmp_path):
+    path = tmp_path / "image.jpg"
+    path.write_bytes(b"\xff\xd8 fake jpeg")
+    return path
+
+
+class TestCacheKey:
+    def test_sampled_calls_are_not_cached(self, client):
+        assert client._cache_key(ModelType.GPT, "p", None, None, {}) is None
+        assert client._cache_key(ModelType.GPT, "p", None, None, {'temperature': 0.3}) is None
+        assert client._cache_key(ModelType.GPT, "p", None, None, {'temperature': 0}) is not None
+
+    def test_key_follows_image_content(self, client, image):
+        params = {'temperature': 0}
+        first = client._cache_key(ModelType.GPT, "p", None, str(image), params)
+        image.write_bytes(b"\xff\xd8 other jpeg content")
+        second = client._cache_key(ModelType.GPT, "p", None, str(image), params)
+        assert first and second and first != second
+
+    def test_missing_image_has_no_key(self, client, tmp_path):
+        params = {'temperature': 0}
+        assert client._cache_key(ModelType.GPT, "p", None, str(tmp_path / "a.jpg"), params) is None
+        assert client._cache_key(ModelType.GPT, "p", None, str(tmp_path / "b.jpg"), params) is None
+
+    def test_image_is_read_once_for_digest_and_encoding(self, client, image, monkeypatch):
+        reads = []
+        encode = client._image_to_data_uri
+        monkeypatch.setattr(client, '_image_to_data_uri', lambda path: reads.append(path) or encode(path))
+
+        client.call_ai(ModelType.GPT, "p", image_path=str(image), cache=True, temperature=0)
+        assert reads == [str(image)]
+
+
+class TestCallCache:
+    def test_cache_is_opt_in(self, client):
+        client.call_ai(ModelType.GPT, "p", temperature=0)
+        client.call_ai(ModelType.GPT, "p", temperature=0)
+        assert len(client.calls) == 2
+
+    def test_deterministic_call_is_cached(self, client, image):
+        first = client.call_ai(ModelType.GPT, "p", image_path=str(image), cache=True, temperature=0)
+        second = client.call_ai(ModelType.GPT, "p", image_path=str(image), cache=True, temperature=0)
+        assert first == second
+        assert len(client.calls) == 1
+
+    def test_image_fallback_is_not_cached(self, client, image, monkeypatch):
+        # 缓存键计算后图像变得不可读，消息回退为纯文本
+        client._image_digest(str(image))
+
+        def fail(path):
+            raise OSError("unreadable")
+
+        monkeypatch.setattr(client, '_get_image_uri', fail)
+        client.call_ai(ModelType.GPT, "p", image_path=str(image), cache=True, temperature=0)
+        client.call_ai(ModelType.GPT, "p", image_path=str(image), cache=True, temperature=0)
+        assert len(client.calls) == 2
+        assert not list(client._cache_dir.glob("*.json"))
+
+    def test_disk_cache_is_capped(self, client, monkeypatch):
+        monkeypatch.setattr(ai_client, '_DISK_CACHE_MAX_FILES', 10)
+        for i in range(25):
+            client._cache_put(f"key{i}", "value")
+        assert len(list(client._cache_dir.glob("*.json"))) <= 10
+
+
+class TestCallBatch:
+    def test_identical_deterministic_requests_share_one_call(self, client):
+        reqs = [{'model_type': ModelType.GPT, 'prompt': "p", 'temperature': 0},
+                {'model_type': "gpt", 'prompt': "p", 'temperature': 0},
+                {'model_type': ModelType.GPT, 'prompt': "q", 'temperature': 0}]
+        results = asyncio.run(client.call_ai_batch(reqs))
+        assert len(client.calls) == 2
+        assert results[0] == results[1]
+
+    def test_sampled_requests_are_not_merged(self, client):
+        reqs = [{'model_type': ModelType.GPT, 'prompt': "p"}] * 2
+        asyncio.run(client.call_ai_batch(reqs))
+        assert len(client.calls) == 2
+
+
+class TestClaude:
+    def test_model_comes_from_settings(self, workspace, monkeypatch):
+        monkeypatch.setattr(get_config().labeling, 'claude_model', "claude-test")
+        assert AIClient().claude_config['model'] == "claude-test"
+
+    def test_missing_sdk_raises_service_error(self, client, monkeypatch):
+        monkeypatch.setitem(sys.modules, 'anthropic', None)
+        with pytest.raises(AIServiceError, match="anthropic"):
+            client._call_claude([{'role': 'user', 'content': "p"}])
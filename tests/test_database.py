@@ -0,0 +1,31 @@
+"""
+数据库事务测试
+"""
+
+import pytest
+
+from tagtragger.storage.database import Database
+from tagtragger.utils.exceptions import StorageError
+
+
+@pytest.fixture
+def db(workspace):
+    db = Database()
+    yield db
+    db.close()
+
+
+class TestTransaction:
+    def test_writes_are_committed(self, db):
+        assert db.save_setting("theme", "dark")
+        assert not db._conn.in_transaction
+        assert db.load_setting("theme") == "dark"
+
+    def test_failed_transaction_is_rolled_back(self, db):
+        db.save_setting("theme", "dark")
+        with pytest.raises(StorageError):
+            with db.transaction() as conn:
+                conn.execute("DELETE FROM settings")
+                raise RuntimeError("boom")
+        assert not db._conn.in_transaction
+        assert db.load_setting("theme") == "dark"
@@ -0,0 +1,198 @@
+"""
+Musubi训练器测试
+"""
+
+import os
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from queue import Queue
+
+import pytest
+
+from tagtragger.core.training.models import TrainingConfig, TrainingState, TrainingTask, TrainingType
+from tagtragger.core.training.trainers import musubi_trainer
+from tagtragger.core.training.trainers.musubi_trainer import MusubiTrainer
+from tagtragger.utils.exceptions import TrainingError
+
+
+@pytest.fixture
+def trainer(workspace):
+    return MusubiTrainer()
+
+
+def _read_chunks(trainer, chunks, log_file=None):
+    """通过管道分块写入，返回读取线程切分出的全部行"""
+    read_fd, write_fd = os.pipe()
+    lines: Queue = Queue()
+    with os.fdopen(read_fd, 'rb', buffering=0) as stream:
+        reader = threading.Thread(target=trainer._read_output, args=(stream, lines, log_file))
+        reader.start()
+        for chunk in chunks:
+            os.write(write_fd, chunk)
+            time.sleep(0.01)
+        os.close(write_fd)
+        reader.join(5)
+
+    result = []
+    while True:
+        line = lines.get_nowait()
+        if line is None:
+            return result
+        result.append(line)
+
+
+class TestReadOutput:
+    def test_splits_newlines_and_carriage_returns(self, trainer):
+        lines = _read_chunks(trainer, [b"epoch 1\nstep 1\rstep 2\r\nloss=0.1\n"])
+        assert lines == ["epoch 1", "step 1", "step 2", "loss=0.1"]
+
+    def test_joins_lines_split_across_chunks(self, trainer):
+        # 多字节字符被拆在两个块之间时仍能正确解码
+        text = "训练开始\n".encode('utf-8')
+        lines = _read_chunks(trainer, [b"par", b"tial line\n" + text[:4], text[4:]])
+        assert lines == ["partial line", "训练开始"]
+
+    def test_flushes_trailing_line_without_newline(self, trainer):
+        assert _read_chunks(trainer, [b"first\nlast"]) == ["first", "last"]
+
+    def test_tees_raw_output_to_log_file(self, trainer, tmp_path):
+        log_file = tmp_path / "training.log"
+        chunks = [b"a\r", b"b\n", b"c"]
+        _read_chunks(trainer, chunks, log_file)
+        assert log_file.read_bytes() == b"".join(chunks)
+
+    def test_log_file_is_written_while_running(self, trainer, tmp_path):
+        log_file = tmp_path / "training.log"
+        read_fd, write_fd = os.pipe()
+        lines: Queue = Queue()
+        with os.fdopen(read_fd, 'rb', buffering=0) as stream:
+            reader = threading.Thread(target=trainer._read_output, args=(stream, lines, log_file))
+            reader.start()
+            os.write(write_fd, b"step 1\n")
+            assert lines.get(timeout=5) == "step 1"
+            # 进程仍在输出时日志文件已包含读到的内容
+            assert log_file.read_bytes() == b"step 1\n"
+            os.close(write_fd)
+            reader.join(5)
+
+    def test_stops_when_queue_is_full(self, trainer):
+        read_fd, write_fd = os.pipe()
+        lines: Queue = Queue(maxsize=1)
+        stop = threading.Event()
+        try:
+            with os.fdopen(read_fd, 'rb', buffering=0) as stream:
+                reader = threading.Thread(target=trainer._read_output, args=(stream, lines, None, stop))
+                reader.start()
+                os.write(write_fd, b"a\nb\nc\n")
+                time.sleep(0.1)
+                # 队列已满且管道写端仍打开，停止标志置位后读取线程也能退出
+                stop.set()
+                reader.join(5)
+                assert not reader.is_alive()
+        finally:
+            os.close(write_fd)
+
+
+# 忽略SIGTERM的训练进程，只有强制终止才会退出
+_IGNORE_SIGTERM = (
+    "import signal, time\n"
+    "signal.signal(signal.SIGTERM, signal.SIG_IGN)\n"
+    "print('ready', flush=True)\n"
+    "time.sleep(30)\n"
+)
+
+
+@pytest.mark.skipif(os.name == 'nt', reason="依赖POSIX进程组信号")
+class TestCancelTraining:
+    @pytest.fixture
+    def proc(self, trainer, monkeypatch):
+        monkeypatch.setattr(musubi_trainer, '_CANCEL_KILL_TIMEOUT', 0.5)
+        proc = subprocess.Popen([sys.executable, "-c", _IGNORE_SIGTERM],
+                                stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                bufsize=0, start_new_session=True)
+        assert proc.stdout.readline() == b"ready\n"
+        trainer._proc = proc
+        yield proc
+        if proc.poll() is None:
+            proc.kill()
+        proc.wait()
+        proc.stdout.close()
+
+    def test_cancel_returns_and_monitor_kills_after_deadline(self, trainer, proc):
+        config = TrainingConfig(name="demo", training_type=TrainingType.QWEN_IMAGE_LORA, dataset_id="ds")
+        task = TrainingTask(id="task-1", name="demo", config=config, state=TrainingState.RUNNING)
+        result = []
+        monitor = threading.Thread(target=lambda: result.append(trainer._monitor_training(task)))
+        monitor.start()
+
+        started = time.monotonic()
+        trainer.cancel_training()
+        assert time.monotonic() - started < 0.5
+        # 只发送了信号，不等待进程退出
+        assert proc.poll() is None
+
+        monitor.join(10)
+        assert not monitor.is_alive()
+        assert proc.poll() is not None
+        assert result == [False]
+        assert task.state == TrainingState.CANCELLED
+        assert trainer._proc is None
+
+
+class TestPrepareTraining:
+    @pytest.fixture
+    def prepared(self, trainer, workspace, monkeypatch):
+        """替换依赖本地模型和运行时的部分，只保留文件生成逻辑"""
+        (workspace / "datasets" / "ds" / "original").mkdir(parents=True)
+        musubi_dir = workspace / "musubi"
+        musubi_dir.mkdir()
+        monkeypatch.setattr(trainer, '_validate_config', lambda config: None)
+        monkeypatch.setattr(trainer, 'get_musubi_path', lambda: musubi_dir)
+        monkeypatch.setattr(trainer, '_get_accelerate_cmd', lambda: ["python", "-m", "accelerate"])
+        monkeypatch.setattr(trainer, '_get_script_path', lambda training_type: "train.py")
+        trainer.__dict__['_musubi_resolved'] = musubi_dir
+
+        config = TrainingConfig(name="demo", training_type=TrainingType.QWEN_IMAGE_LORA,
+                                dataset_id="ds", sample_prompt="a cat")
+        task = TrainingTask(id="task-1", name="demo", config=config)
+        return task, workspace / "trainings" / "task-1"
+
+    def test_unchanged_inputs_skip_all_writes(self, trainer, prepared):
+        task, training_dir = prepared
+        trainer.prepare_training(task)
+        generated = sorted(p for p in training_dir.iterdir() if p.is_file())
+        mtimes = {p: p.stat().st_mtime_ns for p in generated}
+
+        time.sleep(0.02)
+        trainer.prepare_training(task)
+        assert Path(training_dir / "sample_prompts.txt") in mtimes
+        assert {p: p.stat().st_mtime_ns for p in generated} == mtimes
+
+    def test_changed_inputs_regenerate_files(self, trainer, prepared):
+        task, training_dir = prepared
+        trainer.prepare_training(task)
+        digest = (training_dir / ".prepare.hash").read_text(encoding='utf-8')
+
+        task.config.sample_prompt = "a dog"
+        trainer.prepare_training(task)
+        assert (training_dir / "sample_prompts.txt").read_text(encoding='utf-8') == "a dog"
+        assert (training_dir / ".prepare.hash").read_text(encoding='utf-8') != digest
+
+    def test_missing_dataset_fails_even_when_digest_matches(self, trainer, prepared, workspace):
+        task, _ = prepared
+        trainer.prepare_training(task)
+        (workspace / "datasets" / "ds" / "original").rmdir()
+
+        with pytest.raises(TrainingError):
+            trainer.prepare_training(task)
+
+    def test_missing_generated_file_is_rewritten(self, trainer, prepared):
+        task, training_dir = prepared
+        trainer.prepare_training(task)
+        (training_dir / "sample_prompts.txt").unlink()
+
+        trainer.prepare_training(task)
+        assert (training_dir / "sample_prompts.txt").exists()
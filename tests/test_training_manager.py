@@ -0,0 +1,230 @@
+"""
+训练任务管理器测试
+"""
+
+import json
+import threading
+import time
+
+import pytest
+
+from tagtragger.core.training.manager import TrainingManager
+from tagtragger.core.training.models import QwenImageConfig, TrainingConfig, TrainingState, TrainingType
+
+
+def _config(name: str = "demo") -> TrainingConfig:
+    return TrainingConfig(name=name, training_type=TrainingType.QWEN_IMAGE_LORA, dataset_id="ds")
+
+
+def _wait_for(predicate, timeout: float = 5.0) -> bool:
+    """等待后台线程处理完成"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return predicate()
+
+
+@pytest.fixture
+def manager(workspace):
+    return TrainingManager()
+
+
+class TestPersistence:
+    def test_progress_round_trip(self, manager, workspace):
+        task_id = manager.create_task(_config())
+        manager._on_progress(task_id, {
+            'step': 25, 'total_steps': 100, 'progress': 0.25,
+            'epoch': 2, 'loss': 0.125, 'lr': 1e-4,
+        })
+
+        task = TrainingManager().get_task(task_id)
+        assert task.current_step == 25
+        assert task.total_steps == 100
+        assert task.progress == 0.25
+        assert task.current_epoch == 2
+        assert task.loss == 0.125
+        assert task.learning_rate == 1e-4
+        # 配置从字典恢复时枚举和嵌套配置由from_dict转换
+        assert task.config.training_type is TrainingType.QWEN_IMAGE_LORA
+        assert isinstance(task.config.qwen_config, QwenImageConfig)
+        # 进度直接写入数据库，不再生成单独的WAL文件
+        assert not list((workspace / "tasks").glob("*.wal.*"))
+
+    def test_migrates_legacy_json_tasks(self, workspace):
+        tasks_dir = workspace / "tasks"
+        tasks_dir.mkdir()
+        legacy = {
+            'id': 'legacy-task',
+            'name': 'legacy',
+            'config': {'name': 'legacy', 'training_type': 'qwen_image_lora', 'dataset_id': 'ds'},
+            'state': 'completed',
+            'created_at': '2025-01-01T00:00:00',
+            'started_at': None,
+            'completed_at': None,
+            'error_message': None,
+            'logs': ['line'],
+            'progress': 1.0,
+        }
+        (tasks_dir / "legacy-task.json").write_text(json.dumps(legacy), encoding='utf-8')
+
+        task = TrainingManager().get_task('legacy-task')
+        assert task.state == TrainingState.COMPLETED
+        assert task.logs == ['line']
+        assert (tasks_dir / "legacy-task.json.migrated").exists()
+        assert not (tasks_dir / "legacy-task.json").exists()
+
+    def test_queued_task_restored_as_pending(self, manager):
+        task_id = manager.create_task(_config())
+        task = manager.get_task(task_id)
+        task.state = TrainingState.QUEUED
+        manager.save_task(task)
+
+        assert TrainingManager().get_task(task_id).state == TrainingState.PENDING
+
+
+class TestEventPump:
+    def test_log_events_are_not_dropped_and_keep_order(self, manager):
+        task_id = manager.create_task(_config())
+        received = []
+        threads = set()
+
+        def on_log(data):
+            threads.add(threading.get_ident())
+            received.append(data['message'].split('] ', 1)[1])
+
+        manager.add_callback('task_log', on_log)
+        expected = [f"line {i}" for i in range(2000)]
+        for line in expected:
+            manager._on_log(task_id, line)
+
+        assert _wait_for(lambda: len(received) == len(expected))
+        assert received == expected
+        # 回调只在分发线程上执行
+        assert threads == {manager._event_thread.ident}
+
+    def test_progress_events_are_coalesced(self, manager):
+        task_id = manager.create_task(_config())
+        gate = threading.Event()
+        steps = []
+        manager.add_callback('task_state', lambda data: gate.wait(5))
+        manager.add_callback('task_progress', lambda data: steps.append(data['step']))
+
+        # 分发线程阻塞在状态回调上时连续发送多条进度事件
+        manager._emit_event('task_state', {'task_id': task_id, 'state': TrainingState.RUNNING})
+        for step in range(1, 51):
+            manager._emit_event('task_progress', {'task_id': task_id, 'step': step})
+        gate.set()
+
+        assert _wait_for(lambda: steps and steps[-1] == 50)
+        assert steps == [50]
+
+    def test_log_batches_flush_under_sustained_traffic(self, manager):
+        task_id = manager.create_task(_config())
+        batches = []
+        manager.add_callback('task_state', lambda data: time.sleep(0.001))
+        manager.add_callback('task_log_batch', lambda data: batches.append(data['lines']))
+
+        # 持续发送状态事件，分发队列一直不为空
+        stop = threading.Event()
+
+        def flood():
+            while not stop.is_set():
+                manager._emit_event('task_state', {'task_id': task_id, 'state': TrainingState.RUNNING})
+                time.sleep(0.0005)
+
+        flooder = threading.Thread(target=flood)
+        flooder.start()
+        try:
+            time.sleep(0.05)
+            manager._on_log(task_id, "first")
+            manager._on_log(task_id, "second")
+            assert _wait_for(lambda: batches, timeout=1.0)
+        finally:
+            stop.set()
+            flooder.join()
+        assert [line.split('] ', 1)[1] for line in batches[0]] == ["first", "second"]
+
+    def test_full_log_batches_keep_order(self, manager):
+        task_id = manager.create_task(_config())
+        batches = []
+        manager.add_callback('task_log_batch', lambda data: batches.append(data['lines']))
+
+        expected = [f"line {i}" for i in range(300)]
+        for line in expected:
+            manager._on_log(task_id, line)
+
+        assert _wait_for(lambda: sum(map(len, batches)) == len(expected))
+        received = [line.split('] ', 1)[1] for batch in batches for line in batch]
+        assert received == expected
+        assert max(map(len, batches)) <= 64
+
+    def test_emit_from_callback_does_not_block(self, manager):
+        task_id = manager.create_task(_config())
+        states = []
+
+        def on_state(data):
+            states.append(data['state'])
+            if data['state'] == TrainingState.PREPARING:
+                manager._emit_event('task_state', {'task_id': task_id, 'state': TrainingState.RUNNING})
+
+        manager.add_callback('task_state', on_state)
+        manager._emit_event('task_state', {'task_id': task_id, 'state': TrainingState.PREPARING})
+
+        assert _wait_for(lambda: len(states) == 2)
+        assert states == [TrainingState.PREPARING, TrainingState.RUNNING]
+
+
+class TestLogDedup:
+    def test_repeated_lines_are_folded(self, manager):
+        task_id = manager.create_task(_config())
+        for _ in range(4):
+            manager._on_log(task_id, "same")
+        manager._on_log(task_id, "other")
+
+        messages = [entry.split('] ', 1)[1] for entry in manager.get_task(task_id).logs]
+        assert messages == ["same", "[x3] same", "other"]
+
+
+class TestEta:
+    def test_trainer_eta_is_kept(self, manager):
+        task_id = manager.create_task(_config())
+        events = []
+        manager.add_callback('task_progress', events.append)
+
+        payload = {'step': 10, 'total_steps': 100, 'eta_seconds': 77}
+        manager._on_progress(task_id, dict(payload))
+        manager._on_progress(task_id, {'step': 20, 'total_steps': 100, 'eta_seconds': 66})
+
+        assert manager.get_task(task_id).eta_seconds == 66
+        assert _wait_for(lambda: events and events[-1]['eta_seconds'] == 66)
+
+    def test_estimated_eta_does_not_mutate_payload(self, manager):
+        task_id = manager.create_task(_config())
+        first = {'step': 10, 'total_steps': 100, 'eta_seconds': None, 'speed': None}
+        second = {'step': 20, 'total_steps': 100, 'eta_seconds': None, 'speed': None}
+        manager._on_progress(task_id, first)
+        time.sleep(0.05)
+        manager._on_progress(task_id, second)
+
+        assert second == {'step': 20, 'total_steps': 100, 'eta_seconds': None, 'speed': None}
+        task = manager.get_task(task_id)
+        # 估算速度不会冒充训练器输出的速度
+        assert task.speed is None
+        assert task.eta_seconds is not None
+
+    def test_trainer_eta_of_zero_is_kept(self, manager, monkeypatch):
+        task_id = manager.create_task(_config())
+        monkeypatch.setattr(manager, '_estimate_eta', lambda task: 999)
+        manager._on_progress(task_id, {'step': 100, 'total_steps': 100, 'eta_seconds': 0})
+
+        assert manager.get_task(task_id).eta_seconds == 0
+
+    def test_no_eta_without_total_steps(self, manager):
+        task_id = manager.create_task(_config())
+        task = manager.get_task(task_id)
+        task.current_step = 10
+        assert manager._estimate_eta(task) is None
+        task.current_step = 20
+        assert manager._estimate_eta(task) is None